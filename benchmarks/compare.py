@@ -0,0 +1,39 @@
+"""
+Compare two benchmark result files written with --output.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+from typing import Dict, Tuple
+
+def _key(result: Dict) -> Tuple:
+    if "router" in result:
+        return (result["router"], result["concurrency"])
+    return (result["case"], result["length"])
+
+def _metric(result: Dict) -> str:
+    return "p50_ms" if "p50_ms" in result else "median_ms"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+    
+    with open(args.baseline) as f:
+        baseline = {_key(result): result for result in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {_key(result): result for result in json.load(f)["results"]}
+    
+    for key in sorted(baseline.keys() & candidate.keys()):
+        metric = _metric(baseline[key])
+        before = baseline[key][metric]
+        after = candidate[key][metric]
+        change = (after - before) / before * 100 if before else 0.0
+        name = " ".join(str(part) for part in key)
+        print(f"{name:<40} {metric}: {before:>10.3f} -> {after:>10.3f} ({change:+.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Deterministic stand-ins for yfinance and Firebase, so benchmarks run offline.
+
+Call install() before importing the app. Every symbol gets a reproducible random-walk
+price history and fixed fundamentals; Firestore and Firebase Auth are kept in memory.
+"""
+import os
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+# Trading history available from the fixture provider
+FIXTURE_START = pd.Timestamp("2015-01-01")
+MARKET_TIMEZONE = "Asia/Riyadh"
+
+# Sectors handed out to fixture companies
+SECTORS = ["Energy", "Financial Services", "Communication Services", "Basic Materials", "Utilities"]
+
+# Simulated latency of each upstream call in seconds
+upstream_latency = 0.0
+
+# Number of upstream calls served by the fixtures, by operation
+calls: Dict[str, int] = {}
+
+def _record(operation: str) -> None:
+    calls[operation] = calls.get(operation, 0) + 1
+    if upstream_latency:
+        time.sleep(upstream_latency)
+
+def _seed(symbol: str) -> int:
+    # hash() is salted per process, crc32 is stable across runs
+    return zlib.crc32(symbol.encode())
+
+def _trading_days(end: Optional[datetime] = None) -> pd.DatetimeIndex:
+    """Sunday to Thursday sessions, as on Tadawul."""
+    end = pd.Timestamp(end or datetime.now()).tz_localize(None).normalize()
+    days = pd.date_range(FIXTURE_START, end, freq="D")
+    return days[days.dayofweek.isin([6, 0, 1, 2, 3])]
+
+def price_history(symbol: str, days: Optional[int] = None) -> pd.DataFrame:
+    """Build the full fixture price history of a symbol, optionally only the last `days` bars."""
+    index = _trading_days()
+    rng = np.random.default_rng(_seed(symbol))
+    returns = rng.normal(0.0003, 0.015, len(index))
+    close = 30 * np.exp(np.cumsum(returns))
+    spread = np.abs(rng.normal(0, 0.005, len(index)))
+    
+    df = pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.003, len(index))),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(100_000, 5_000_000, len(index)),
+    }, index=index.tz_localize(MARKET_TIMEZONE))
+    
+    if days is not None:
+        df = df.iloc[-days:]
+    return df
+
+def _slice(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    tz = df.index.tz
+    if start is not None:
+        start = pd.Timestamp(start)
+        start = start.tz_localize(tz) if start.tzinfo is None else start.tz_convert(tz)
+        df = df[df.index >= start]
+    if end is not None:
+        end = pd.Timestamp(end)
+        end = end.tz_localize(tz) if end.tzinfo is None else end.tz_convert(tz)
+        df = df[df.index < end]
+    return df
+
+class FixtureTicker:
+    """Stand-in for yf.Ticker."""
+    
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+    
+    def history(self, start=None, end=None, period=None, **kwargs) -> pd.DataFrame:
+        _record("history")
+        return _slice(price_history(self.symbol), start, end)
+    
+    @property
+    def info(self) -> Dict:
+        _record("info")
+        rng = np.random.default_rng(_seed(self.symbol) + 1)
+        return {
+            "trailingPE": float(rng.uniform(5, 40)),
+            "returnOnEquity": float(rng.uniform(-0.05, 0.35)),
+            "returnOnAssets": float(rng.uniform(-0.02, 0.15)),
+            "dividendYield": float(rng.uniform(0, 0.08)),
+            "payoutRatio": float(rng.uniform(0, 1.2)),
+            "sector": SECTORS[_seed(self.symbol) % len(SECTORS)],
+        }
+    
+    @property
+    def fast_info(self) -> Dict:
+        _record("quote")
+        close = price_history(self.symbol, days=2)["Close"]
+        return {"lastPrice": float(close.iloc[-1]), "previousClose": float(close.iloc[0])}
+
+def fixture_download(tickers: Union[str, List[str]], start=None, end=None, group_by: str = "column", **kwargs) -> pd.DataFrame:
+    """Stand-in for yf.download, returning unlocalized dates like the real one."""
+    _record("download")
+    symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+    frames = {}
+    for symbol in symbols:
+        df = _slice(price_history(symbol), start, end)
+        frames[symbol] = df.tz_localize(None)
+    
+    data = pd.concat(frames, axis=1)
+    if group_by != "ticker":
+        data = data.swaplevel(0, 1, axis=1).sort_index(axis=1)
+    return data
+
+class _Snapshot:
+    def __init__(self, data: Optional[Dict]):
+        self._data = data
+    
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+    
+    def to_dict(self) -> Optional[Dict]:
+        return None if self._data is None else dict(self._data)
+
+class _Document:
+    def __init__(self, store: Dict, key: str):
+        self._store = store
+        self._key = key
+    
+    def get(self) -> _Snapshot:
+        _record("firestore_get")
+        return _Snapshot(self._store.get(self._key))
+    
+    def set(self, data: Dict) -> None:
+        _record("firestore_set")
+        self._store[self._key] = dict(data)
+
+class _Collection:
+    def __init__(self, store: Dict):
+        self._store = store
+    
+    def document(self, key: str) -> _Document:
+        return _Document(self._store, key)
+
+class InMemoryFirestore:
+    """Stand-in for the Firestore client."""
+    
+    def __init__(self):
+        self._collections: Dict[str, Dict] = {}
+    
+    def collection(self, name: str) -> _Collection:
+        return _Collection(self._collections.setdefault(name, {}))
+
+class _Credentials:
+    project_id = "mefic-benchmark"
+
+def verify_id_token(token: str, *args, **kwargs) -> Dict:
+    """Accept any token of the form "user-<id>"."""
+    _record("verify_token")
+    if not token.startswith("user-"):
+        raise ValueError("Invalid token")
+    return {"uid": token}
+
+def install(latency: float = 0.0) -> None:
+    """Replace yfinance and Firebase with the fixtures. Must run before the app is imported."""
+    global upstream_latency
+    upstream_latency = latency
+    
+    import yfinance as yf
+    import firebase_admin
+    from firebase_admin import auth, credentials, firestore
+    from services import firebase_app
+    
+    yf.Ticker = FixtureTicker
+    yf.download = fixture_download
+    
+    database = InMemoryFirestore()
+    firebase_app.get_project_id = lambda: _Credentials.project_id
+    credentials.Certificate = lambda path: _Credentials()
+    firebase_admin.initialize_app = lambda *args, **kwargs: firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore.client = lambda *args, **kwargs: database
+    auth.verify_id_token = verify_id_token
+    
+    # Start from an empty fundamentals store rather than whatever the working copy holds
+    os.environ.setdefault("FUNDAMENTALS_DIR", tempfile.mkdtemp(prefix="mefic-fundamentals-"))
@@ -0,0 +1,181 @@
+"""
+Load test of every router against the offline fixtures.
+
+Usage:
+    python -m benchmarks.load --concurrency 1,8,32 --requests 200 --output load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+import numpy as np
+from benchmarks import fixtures
+
+SYMBOLS = ['2222.SR', '1180.SR', '2350.SR', '1010.SR', '1150.SR', '2310.SR', '2380.SR', '1050.SR', '2001.SR', '2330.SR']
+
+# Requests issued per router: (method, path, JSON body). {symbol} rotates over the universe.
+SCENARIOS: Dict[str, List[Tuple[str, str, Dict]]] = {
+    "stocks": [
+        ("GET", "/stocks/available", None),
+        ("GET", "/stocks/{symbol}/history?period=1Y", None),
+    ],
+    "financial": [
+        ("GET", "/financial/metrics/{symbol}", None),
+        ("GET", "/financial/comparison", None),
+    ],
+    "technical": [
+        ("GET", "/technical/indicators/{symbol}?period=1Y", None),
+    ],
+    "risk": [
+        ("GET", "/risk/metrics/{symbol}", None),
+        ("GET", "/risk/metrics", None),
+        ("GET", "/risk/rolling/{symbol}", None),
+    ],
+    "portfolio": [
+        ("GET", "/portfolio/metrics/{symbol}", None),
+        ("GET", "/portfolio/metrics", None),
+    ],
+    "screener": [
+        ("POST", "/screener/", {"pe_ratio": 0.4, "roe": 0.2, "roa": 0.2, "dividend_yield": 0.2}),
+    ],
+    "user_portfolio": [
+        ("GET", "/user-portfolio/", None),
+        ("POST", "/user-portfolio/add", {"symbol": "{symbol}", "allocation": 10.0}),
+    ],
+    "analysis": [
+        ("GET", "/analysis/{symbol}", None),
+    ],
+}
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles of a run, in requests/s and milliseconds."""
+    values = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+def _fill(value, symbol: str):
+    if isinstance(value, str):
+        return value.format(symbol=symbol)
+    if isinstance(value, dict):
+        return {key: _fill(item, symbol) for key, item in value.items()}
+    return value
+
+async def run_router(client, router: str, concurrency: int, total: int) -> Dict[str, float]:
+    """Send `total` requests for a router with `concurrency` requests in flight."""
+    requests = itertools.cycle(
+        (method, _fill(path, symbol), _fill(body, symbol))
+        for symbol in SYMBOLS
+        for method, path, body in SCENARIOS[router]
+    )
+    headers = {"Authorization": "Bearer user-benchmark"}
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+    
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = next(requests)
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+async def run(routers: List[str], concurrency_levels: List[int], total: int, cold: bool) -> List[Dict]:
+    import httpx
+    import main
+    from services import financial_service, portfolio_service, risk_service, screener_service, stock_service, technical_service
+    from services.market_data import TokenBucket, market_data
+    
+    # The fixtures are not throttled, so measure the app rather than the rate limiter
+    market_data.bucket = TokenBucket(rate=float("inf"), capacity=float("inf"))
+    
+    caches = [
+        stock_service.price_cache,
+        financial_service.fundamentals_cache,
+        screener_service.screener_cache,
+    ]
+    result_caches = [
+        technical_service.indicator_cache,
+        risk_service.risk_cache,
+        portfolio_service.portfolio_cache,
+    ]
+    
+    # Keep runs independent of whatever an earlier process left in the shared cache
+    for cache in caches:
+        cache.shared = None
+    
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for router in routers:
+            for concurrency in concurrency_levels:
+                if cold:
+                    for cache in caches + result_caches:
+                        cache.clear()
+                fixtures.calls.clear()
+                
+                summary = await run_router(client, router, concurrency, total)
+                summary.update(router=router, concurrency=concurrency, upstream_calls=dict(fixtures.calls))
+                results.append(summary)
+                print(
+                    f"{router:<15} c={concurrency:<4} {summary['throughput_rps']:>9.1f} req/s  "
+                    f"p50={summary['p50_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms  "
+                    f"errors={summary['errors']}"
+                )
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the API routers against offline fixtures.")
+    parser.add_argument("--routers", default=",".join(SCENARIOS), help="Comma-separated routers to test")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per router and concurrency level")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="Simulated seconds per upstream call")
+    parser.add_argument("--cold", action="store_true", help="Clear the caches before every run")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    
+    routers = [router.strip() for router in args.routers.split(",") if router.strip()]
+    unknown = [router for router in routers if router not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown routers: {', '.join(unknown)}")
+    
+    fixtures.install(latency=args.upstream_latency)
+    results = asyncio.run(run(
+        routers, [int(level) for level in args.concurrency.split(",")], args.requests, args.cold
+    ))
+    
+    if args.output:
+        report = {
+            "benchmark": "load",
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmarks of the service calculations over growing history lengths.
+
+Usage:
+    python -m benchmarks.micro --lengths 250,1000,2500,5000 --output micro.json
+"""
+import argparse
+import json
+import platform
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+import numpy as np
+import pandas as pd
+from benchmarks import fixtures
+
+def measure(func: Callable, repeat: int) -> Dict[str, float]:
+    """Time a function, returning the best and median of `repeat` runs in milliseconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = np.array(timer.repeat(repeat=repeat, number=number)) / number * 1000
+    return {"best_ms": float(runs.min()), "median_ms": float(np.median(runs)), "loops": number}
+
+def cases(length: int, universe: int) -> Dict[str, Callable]:
+    """Calculations to time for a history of `length` bars."""
+    from services.stock_service import StockService
+    from services.technical_service import TechnicalService
+    from services.risk_service import RiskService
+    from services.portfolio_service import PortfolioService
+    
+    df = fixtures.price_history("2222.SR", days=length + 1)
+    market = fixtures.price_history("^TASI", days=length + 1)["Close"]
+    returns = StockService.get_daily_returns(df["Close"])
+    market_returns = StockService.get_daily_returns(market)
+    
+    symbols = [f"{1000 + i}.SR" for i in range(universe)]
+    matrix = pd.DataFrame({
+        symbol: StockService.get_daily_returns(fixtures.price_history(symbol, days=length + 1)["Close"]).to_numpy()
+        for symbol in symbols
+    }, index=market_returns.index)
+    
+    return {
+        "technical_indicators": lambda: TechnicalService.compute_technical_indicators(df["Close"]),
+        "risk_metrics": lambda: RiskService.compute_risk_metrics(returns, market_returns),
+        "portfolio_metrics": lambda: PortfolioService.compute_portfolio_metrics(returns, market_returns),
+        "rolling_risk_metrics": lambda: RiskService.compute_rolling_risk_metrics(returns, market_returns, [20, 60, 120]),
+        f"risk_metrics_matrix_{universe}": lambda: RiskService.compute_risk_metrics_matrix(matrix, market_returns),
+        f"portfolio_metrics_matrix_{universe}": lambda: PortfolioService.compute_portfolio_metrics_matrix(matrix, market_returns),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark the service calculations.")
+    parser.add_argument("--lengths", default="250,500,1000,2500", help="Comma-separated history lengths in bars")
+    parser.add_argument("--universe", type=int, default=50, help="Number of symbols in the batch matrix cases")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per case")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    
+    fixtures.install()
+    
+    results: List[Dict] = []
+    for length in [int(length) for length in args.lengths.split(",")]:
+        for name, func in cases(length, args.universe).items():
+            timing = measure(func, args.repeat)
+            timing.update(case=name, length=length)
+            results.append(timing)
+            print(f"{name:<28} n={length:<6} best={timing['best_ms']:.3f}ms median={timing['median_ms']:.3f}ms")
+    
+    if args.output:
+        report = {
+            "benchmark": "micro",
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,78 @@
-from fastapi import FastAPI
+import time
+
+# Startup timings are measured from the moment the app module starts importing
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+import math
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OpenIdConnect
-import firebase_admin
-from routes import stocks, financial, technical, risk, portfolio, user_portfolio, screener
+from routes import stocks, financial, technical, risk, portfolio, user_portfolio, screener, analysis, quotes
 from models import ErrorResponse
+from services.cache_warmer import cache_warmer
+from services.quote_stream import quote_hub
+from services.metrics import MetricsMiddleware, registry
+from services.access_log import AccessLogMiddleware, setup_logging, stop_logging
+from services.market_data import UpstreamUnavailableError
+from services.firebase_app import get_project_id, preload_firebase
+from services.lazy import load_modules
 import logging
 
 logger = logging.getLogger(__name__)
 
-if not firebase_admin._apps:
-    cred = firebase_admin.credentials.Certificate("credentials.json")
-    firebase_admin.initialize_app(cred)
+# Heavy libraries loaded in the background after startup
+ANALYTICS_MODULES = ["numpy", "pandas", "yfinance"]
 
-openid_connect_url = f"https://securetoken.google.com/{cred.project_id}/.well-known/openid-configuration"
+openid_connect_url = f"https://securetoken.google.com/{get_project_id()}/.well-known/openid-configuration"
 security_scheme = OpenIdConnect(openIdConnectUrl=openid_connect_url)
 
+# Seconds from the start of the import until each startup phase finished
+startup_report = {}
+
+def _elapsed() -> float:
+    return round(time.perf_counter() - IMPORT_STARTED, 3)
+
+async def warm_up():
+    """Load the analytics stack and Firebase once the server is accepting requests."""
+    try:
+        await asyncio.to_thread(load_modules, ANALYTICS_MODULES)
+        startup_report["analytics_loaded"] = _elapsed()
+    except Exception:
+        logger.exception("Loading the analytics stack failed")
+    
+    try:
+        await asyncio.to_thread(preload_firebase)
+        startup_report["firebase_ready"] = _elapsed()
+    except Exception:
+        logger.exception("Firebase initialization failed")
+    
+    cache_warmer.start()
+    logger.info("Startup report: %s", startup_report)
+
+# --- Lifespan ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start serving right away and warm up heavy dependencies in the background."""
+    # Set up here rather than on import, and again if the app is started twice in one process
+    setup_logging()
+    startup_report["serving"] = _elapsed()
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    await quote_hub.stop()
+    await cache_warmer.stop()
+    stop_logging()
+
 # --- Basic App Setup ---
 app = FastAPI(
     title="Mefic API",
     description="API for fetching stock data and analysis for the Mefic app.",
     version="0.1.0",
-    responses={422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}}
+    responses={422: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    lifespan=lifespan
 )
 
 # --- CORS Configuration ---
@@ -38,12 +90,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Error Handling ---
+@app.exception_handler(UpstreamUnavailableError)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailableError):
+    """Fail fast with 503 while market data providers are degraded."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+# --- Metrics and Access Log ---
+# The access log runs inside the metrics middleware to read its upstream timings
+app.add_middleware(AccessLogMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # --- Root Endpoint ---
 @app.get("/")
 async def read_root():
     """Root endpoint to check if the API is running."""
     return {"message": "Welcome to the Mefic API!"}
 
+@app.get("/health")
+async def health():
+    """Health check with the startup timings of this process."""
+    return {
+        "status": "ok",
+        "ready": "analytics_loaded" in startup_report and "firebase_ready" in startup_report,
+        "startup": startup_report
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Expose request, upstream and cache metrics in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(stocks.router)
 app.include_router(financial.router)
 app.include_router(technical.router)
@@ -51,15 +132,7 @@ app.include_router(risk.router)
 app.include_router(portfolio.router)
 app.include_router(user_portfolio.router)
 app.include_router(screener.router)
+app.include_router(analysis.router)
+app.include_router(quotes.router)
 
-@app.middleware("http")
-async def log_requests(request, call_next):
-    """Log request details for debugging"""
-    logger.info(f"Request path: {request.url.path}")
-    logger.info(f"Request method: {request.method}")
-    logger.info(f"Request headers: {request.headers.get('authorization', 'None')[:15]}...")
-    
-    response = await call_next(request)
-    
-    logger.info(f"Response status: {response.status_code}")
-    return response
\ No newline at end of file
+startup_report["app_imported"] = _elapsed()
@@ -16,10 +16,29 @@ class StockHistoryResponse(BaseModel):
     company_name: str
     data: List[StockPrice]
 
+# Live Quote Model
+class Quote(BaseModel):
+    symbol: str
+    price: float
+    previous_close: Optional[float] = None
+    change: Optional[float] = None
+    change_percent: Optional[float] = None  # (%)
+    timestamp: datetime
+
 # Financial Metrics Model
 class FinancialMetrics(BaseModel):
     symbol: str
     company_name: str
+    sector: Optional[str] = None
+    pe_ratio: Optional[float] = None
+    roe: Optional[float] = None  # Return on Equity (%)
+    roa: Optional[float] = None  # Return on Assets (%)
+    dividend_score: Optional[float] = None
+    dividend_yield: Optional[float] = None  # (%)
+    payout_ratio: Optional[float] = None  # (%)
+
+class FinancialMetricsSnapshot(BaseModel):
+    date: date
     pe_ratio: Optional[float] = None
     roe: Optional[float] = None  # Return on Equity (%)
     roa: Optional[float] = None  # Return on Assets (%)
@@ -27,6 +46,11 @@ class FinancialMetrics(BaseModel):
     dividend_yield: Optional[float] = None  # (%)
     payout_ratio: Optional[float] = None  # (%)
 
+class FinancialHistoryResponse(BaseModel):
+    symbol: str
+    company_name: str
+    history: List[FinancialMetricsSnapshot]
+
 # Technical Indicators Model
 class TechnicalIndicators(BaseModel):
     symbol: str
@@ -48,6 +72,23 @@ class RiskMetrics(BaseModel):
     sharpe_ratio: float
     max_drawdown: float  # (%)
 
+class RollingRiskWindow(BaseModel):
+    window: int  # Trading days
+    beta: List[Optional[float]]
+    volatility: List[Optional[float]]  # (%)
+    sharpe_ratio: List[Optional[float]]
+
+class RollingRiskMetrics(BaseModel):
+    symbol: str
+    period: str
+    dates: List[date]
+    drawdown: List[float]  # (%)
+    windows: List[RollingRiskWindow]
+
+class RiskMetricsBatchResponse(BaseModel):
+    period: str
+    metrics: List[RiskMetrics]
+
 # Portfolio Metrics Model
 class PortfolioMetrics(BaseModel):
     symbol: str
@@ -56,10 +97,15 @@ class PortfolioMetrics(BaseModel):
     info_ratio: float
     tracking_error: float  # (%)
 
+class PortfolioMetricsBatchResponse(BaseModel):
+    period: str
+    metrics: List[PortfolioMetrics]
+
 # Stock Comparison Row Model
 class StockComparisonItem(BaseModel):
     symbol: str
     company: str
+    sector: Optional[str] = None
     pe_ratio: Optional[float] = None
     roe: Optional[float] = None  # (%)
     roa: Optional[float] = None  # (%)
@@ -78,3 +124,13 @@ class DateRangeRequest(BaseModel):
 # Error Response Model
 class ErrorResponse(BaseModel):
     detail: str
+
+# Consolidated Analysis Model
+class AnalysisResponse(BaseModel):
+    symbol: str
+    company_name: str
+    period: str
+    technical: Optional[TechnicalIndicators] = None
+    risk: Optional[RiskMetrics] = None
+    portfolio: Optional[PortfolioMetrics] = None
+    financial: Optional[FinancialMetrics] = None
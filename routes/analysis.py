@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from services.stock_service import StockService
+from services.analysis_service import AnalysisService
+from services.admission import admission, all_cached, fundamentals_cached, prices_cached
+from models import (
+    AnalysisResponse, TechnicalIndicators, RiskMetrics, PortfolioMetrics, FinancialMetrics
+)
+
+router = APIRouter(
+    prefix="/analysis",
+    tags=["analysis"],
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(admission("analysis", limit=4, is_cached=all_cached(prices_cached(benchmark=True), fundamentals_cached)))]
+)
+
+@router.get("/{symbol}", response_model=AnalysisResponse)
+async def get_analysis(
+    symbol: str,
+    period: str = Query("1Y", description="Time period: 1M, 3M, 6M, 1Y, 2Y, 5Y"),
+    fields: Optional[str] = Query(None, description="Comma-separated sections: technical, risk, portfolio, financial")
+):
+    """Get technical, risk, portfolio and financial analysis for a stock in one request."""
+    stocks = await StockService.get_available_stocks()
+    
+    if symbol not in stocks:
+        raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
+    
+    try:
+        sections = AnalysisService.parse_fields(fields)
+        analysis = await AnalysisService.get_analysis(symbol, period, sections)
+        
+        return AnalysisResponse(
+            symbol=symbol,
+            company_name=stocks[symbol],
+            period=period,
+            technical=TechnicalIndicators(symbol=symbol, **analysis["technical"]) if "technical" in analysis else None,
+            risk=RiskMetrics(symbol=symbol, **analysis["risk"]) if "risk" in analysis else None,
+            portfolio=PortfolioMetrics(symbol=symbol, **analysis["portfolio"]) if "portfolio" in analysis else None,
+            financial=FinancialMetrics(symbol=symbol, company_name=stocks[symbol], **analysis["financial"]) if "financial" in analysis else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
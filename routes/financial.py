@@ -1,12 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from typing import Optional
 from services.financial_service import FinancialService
 from services.stock_service import StockService
-from models import FinancialMetrics, StockComparisonResponse, StockComparisonItem
+from services.admission import admission, fundamentals_cached
+from models import (
+    FinancialMetrics, FinancialHistoryResponse, FinancialMetricsSnapshot, StockComparisonResponse, StockComparisonItem
+)
 
 router = APIRouter(
     prefix="/financial",
     tags=["financial"],
-    responses={404: {"description": "Not found"}}
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(admission("financial", limit=4, is_cached=fundamentals_cached))]
 )
 
 @router.get("/metrics/{symbol}", response_model=FinancialMetrics)
@@ -28,6 +34,26 @@ async def get_financial_metrics(symbol: str):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/history/{symbol}", response_model=FinancialHistoryResponse)
+async def get_financial_history(
+    symbol: str,
+    start_date: Optional[date] = Query(None, description="First snapshot date to include"),
+    end_date: Optional[date] = Query(None, description="Last snapshot date to include")
+):
+    """Get the daily history of key financial metrics for a specific stock."""
+    stocks = await StockService.get_available_stocks()
+    
+    if symbol not in stocks:
+        raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
+    
+    history = await FinancialService.get_financial_history(symbol, start_date, end_date)
+    
+    return FinancialHistoryResponse(
+        symbol=symbol,
+        company_name=stocks[symbol],
+        history=[FinancialMetricsSnapshot(**snapshot) for snapshot in history]
+    )
+
 @router.get("/comparison", response_model=StockComparisonResponse)
 async def get_stock_comparison():
     """Get comparison of key financial metrics for all stocks."""
@@ -41,6 +67,7 @@ async def get_stock_comparison():
                 StockComparisonItem(
                     symbol=item["symbol"],
                     company=item["company"],
+                    sector=item.get("sector"),
                     pe_ratio=item.get("pe_ratio"),
                     roe=item.get("roe"),
                     roa=item.get("roa"),
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
 from services.stock_service import StockService
 from services.portfolio_service import PortfolioService
-from models import PortfolioMetrics
+from services.admission import admission, prices_cached
+from models import PortfolioMetrics, PortfolioMetricsBatchResponse
 
 router = APIRouter(
     prefix="/portfolio",
     tags=["portfolio"],
-    responses={404: {"description": "Not found"}}
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(admission("portfolio", limit=4, is_cached=prices_cached(benchmark=True)))]
 )
 
 @router.get("/metrics/{symbol}", response_model=PortfolioMetrics)
@@ -22,31 +24,39 @@ async def get_portfolio_metrics(
         raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
     
     try:
-        # Convert period to actual dates
-        end_date = datetime.now()
-        date_ranges = {
-            "1M": 30,
-            "3M": 90,
-            "6M": 180,
-            "1Y": 365,
-            "2Y": 730,
-            "5Y": 1825
-        }
-        
-        if period not in date_ranges:
-            raise HTTPException(status_code=400, detail=f"Invalid period: {period}")
-            
-        start_date = end_date - timedelta(days=date_ranges[period])
-        
-        # Get stock data
-        df = await StockService.get_stock_data(symbol, start_date, end_date)
-        
-        # Calculate portfolio metrics
-        metrics = await PortfolioService.calculate_portfolio_metrics(df)
+        # Calculate portfolio metrics, reusing the cached result for unchanged data
+        metrics = await PortfolioService.get_portfolio_metrics(symbol, period)
         
         return PortfolioMetrics(
             symbol=symbol,
             **metrics
         )
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics", response_model=PortfolioMetricsBatchResponse)
+async def get_batch_portfolio_metrics(
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols, defaults to all available stocks"),
+    period: str = "1Y"
+):
+    """Get portfolio metrics for many stocks in one request."""
+    stocks = await StockService.get_available_stocks()
+    
+    symbol_list = [symbol.strip() for symbol in symbols.split(",") if symbol.strip()] if symbols else list(stocks)
+    for symbol in symbol_list:
+        if symbol not in stocks:
+            raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
+    
+    try:
+        # Convert period to actual dates
+        start_date, end_date = StockService.get_date_range(period)
+        
+        # Calculate metrics for all symbols over one aligned returns matrix
+        metrics = await PortfolioService.calculate_batch_portfolio_metrics(symbol_list, start_date, end_date)
+        
+        return PortfolioMetricsBatchResponse(
+            period=period,
+            metrics=[PortfolioMetrics(**item) for item in metrics]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,88 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from typing import List
+from services.stock_service import StockService
+from services.quote_stream import quote_hub
+
+router = APIRouter(
+    prefix="/quotes",
+    tags=["quotes"],
+    responses={404: {"description": "Not found"}}
+)
+
+# Send a comment line on idle SSE connections so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
+async def parse_symbols(symbols: str) -> List[str]:
+    """Split a comma-separated symbol list and check that every symbol is available."""
+    stocks = await StockService.get_available_stocks()
+    
+    symbol_list = list(dict.fromkeys(symbol.strip() for symbol in symbols.split(",") if symbol.strip()))
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    
+    for symbol in symbol_list:
+        if symbol not in stocks:
+            raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
+    return symbol_list
+
+@router.get("/stream")
+async def stream_quotes(
+    request: Request,
+    symbols: str = Query(..., description="Comma-separated symbols")
+):
+    """Stream live quotes for the given stocks as Server-Sent Events."""
+    symbol_list = await parse_symbols(symbols)
+    
+    async def events():
+        queue = quote_hub.subscribe(symbol_list)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    quote = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: quote\ndata: {quote.model_dump_json()}\n\n"
+        finally:
+            quote_hub.unsubscribe(queue, symbol_list)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def websocket_quotes(
+    websocket: WebSocket,
+    symbols: str = Query(..., description="Comma-separated symbols")
+):
+    """Push live quotes for the given stocks over a WebSocket."""
+    try:
+        symbol_list = await parse_symbols(symbols)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+    
+    await websocket.accept()
+    queue = quote_hub.subscribe(symbol_list)
+    
+    async def send_quotes():
+        while True:
+            quote = await queue.get()
+            await websocket.send_text(quote.model_dump_json())
+    
+    sender = asyncio.create_task(send_quotes())
+    try:
+        # Clients only listen; wait for them to disconnect
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        quote_hub.unsubscribe(queue, symbol_list)
+        # Collect the sender, including any error it died with, so none goes unretrieved
+        await asyncio.gather(sender, return_exceptions=True)
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
 from services.stock_service import StockService
 from services.risk_service import RiskService
-from models import RiskMetrics
+from services.admission import admission, prices_cached
+from models import RiskMetrics, RiskMetricsBatchResponse, RollingRiskMetrics, RollingRiskWindow
 
 router = APIRouter(
     prefix="/risk",
     tags=["risk"],
-    responses={404: {"description": "Not found"}}
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(admission("risk", limit=4, is_cached=prices_cached(benchmark=True)))]
 )
 
 @router.get("/metrics/{symbol}", response_model=RiskMetrics)
@@ -21,32 +24,89 @@ async def get_risk_metrics(
     if symbol not in stocks:
         raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
     
+    try:
+        # Calculate risk metrics, reusing the cached result for unchanged data
+        metrics = await RiskService.get_risk_metrics(symbol, period)
+        
+        return RiskMetrics(
+            symbol=symbol,
+            **metrics
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics", response_model=RiskMetricsBatchResponse)
+async def get_batch_risk_metrics(
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols, defaults to all available stocks"),
+    period: str = "1Y"
+):
+    """Get risk metrics for many stocks in one request."""
+    stocks = await StockService.get_available_stocks()
+    
+    symbol_list = [symbol.strip() for symbol in symbols.split(",") if symbol.strip()] if symbols else list(stocks)
+    for symbol in symbol_list:
+        if symbol not in stocks:
+            raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
+    
     try:
         # Convert period to actual dates
-        end_date = datetime.now()
-        date_ranges = {
-            "1M": 30,
-            "3M": 90,
-            "6M": 180,
-            "1Y": 365,
-            "2Y": 730,
-            "5Y": 1825
-        }
+        start_date, end_date = StockService.get_date_range(period)
         
-        if period not in date_ranges:
-            raise HTTPException(status_code=400, detail=f"Invalid period: {period}")
-            
-        start_date = end_date - timedelta(days=date_ranges[period])
+        # Calculate metrics for all symbols over one aligned returns matrix
+        metrics = await RiskService.calculate_batch_risk_metrics(symbol_list, start_date, end_date)
+        
+        return RiskMetricsBatchResponse(
+            period=period,
+            metrics=[RiskMetrics(**item) for item in metrics]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _to_list(values) -> list:
+    """Convert an array to a JSON-friendly list with None in place of NaN and infinities."""
+    return [float(value) if math.isfinite(value) else None for value in values]
+
+@router.get("/rolling/{symbol}", response_model=RollingRiskMetrics)
+async def get_rolling_risk_metrics(
+    symbol: str,
+    period: str = "2Y",
+    windows: str = Query("20,60,120", description="Comma-separated rolling window sizes in trading days")
+):
+    """Get rolling beta, volatility, Sharpe ratio and the drawdown curve for a specific stock."""
+    stocks = await StockService.get_available_stocks()
+    
+    if symbol not in stocks:
+        raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
+    
+    try:
+        window_list = [int(window) for window in windows.split(",") if window.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid windows: {windows}")
+    
+    try:
+        # Convert period to actual dates
+        start_date, end_date = StockService.get_date_range(period)
         
         # Get stock data
         df = await StockService.get_stock_data(symbol, start_date, end_date)
         
-        # Calculate risk metrics
-        metrics = await RiskService.calculate_risk_metrics(df)
+        # Calculate rolling risk metrics
+        rolling = await RiskService.calculate_rolling_risk_metrics(df, window_list)
         
-        return RiskMetrics(
+        return RollingRiskMetrics(
             symbol=symbol,
-            **metrics
+            period=period,
+            dates=[timestamp.date() for timestamp in rolling["dates"]],
+            drawdown=_to_list(rolling["drawdown"]),
+            windows=[
+                RollingRiskWindow(
+                    window=item["window"],
+                    beta=_to_list(item["beta"]),
+                    volatility=_to_list(item["volatility"]),
+                    sharpe_ratio=_to_list(item["sharpe_ratio"])
+                )
+                for item in rolling["windows"]
+            ]
         )
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
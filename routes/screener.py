@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, List, Optional
-from services.screener_service import ScreenerService
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from services.screener_service import ScreenerService, DEFAULT_SORT
+from services.admission import admission, fundamentals_cached
 from pydantic import BaseModel, Field
 
 router = APIRouter(
     prefix="/screener",
     tags=["screener"],
-    responses={404: {"description": "Not found"}}
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(admission("screener", limit=2, is_cached=fundamentals_cached))]
 )
 
 class ScreenerWeights(BaseModel):
@@ -15,20 +17,64 @@ class ScreenerWeights(BaseModel):
     roa: float = Field(0.25, ge=0.0, le=1.0)
     dividend_yield: float = Field(0.25, ge=0.0, le=1.0)
 
+class ScreenerRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class ScreenerFilters(BaseModel):
+    pe_ratio: Optional[ScreenerRange] = None
+    roe: Optional[ScreenerRange] = None  # (%)
+    roa: Optional[ScreenerRange] = None  # (%)
+    dividend_yield: Optional[ScreenerRange] = None  # (%)
+    payout_ratio: Optional[ScreenerRange] = None  # (%)
+    dividend_score: Optional[ScreenerRange] = None
+    weighted_score: Optional[ScreenerRange] = None
+    sector: Optional[List[str]] = None
+
+class ScreenerQuery(ScreenerWeights):
+    filters: ScreenerFilters = Field(default_factory=ScreenerFilters)
+    sort: List[str] = Field(list(DEFAULT_SORT), description="Metrics or symbol, prefixed with - for descending")
+    limit: int = Field(50, ge=1, le=500)
+    cursor: Optional[str] = None
+
+class ScreenerStock(BaseModel):
+    symbol: str
+    company: str
+    sector: Optional[str] = None
+    pe_ratio: Optional[float] = None
+    roe: Optional[float] = None  # (%)
+    roa: Optional[float] = None  # (%)
+    dividend_score: Optional[float] = None
+    dividend_yield: Optional[float] = None  # (%)
+    payout_ratio: Optional[float] = None  # (%)
+    weighted_score: float
+
 class ScreenerResponse(BaseModel):
-    stocks: List[Dict]
+    stocks: List[ScreenerStock]
+    total: int
+    next_cursor: Optional[str] = None
 
 @router.post("/", response_model=ScreenerResponse)
-async def get_screener_data(weights: Optional[ScreenerWeights] = None):
-    """Get stock screener data with custom weights for financial metrics"""
+async def get_screener_data(query: Optional[ScreenerQuery] = None):
+    """Screen stocks with custom weights for financial metrics, filtered, sorted and paginated"""
+    if query is None:
+        query = ScreenerQuery()
+    
     try:
-        if weights:
-            # Convert Pydantic model to dict
-            weights_dict = weights.dict()
-        else:
-            weights_dict = None
-            
-        stocks = await ScreenerService.get_screener_data(weights_dict)
-        return {"stocks": stocks}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
+        weights = query.dict(include={"pe_ratio", "roe", "roa", "dividend_yield"})
+        ranges = {
+            metric: (bounds.min, bounds.max)
+            for metric, bounds in query.filters
+            if metric != "sector" and bounds is not None
+        }
+        
+        return await ScreenerService.screen(
+            weights,
+            ranges=ranges,
+            sectors=query.filters.sector,
+            sort=query.sort,
+            limit=query.limit,
+            cursor=query.cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
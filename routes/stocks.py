@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Dict, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from services.stock_service import StockService
+from services.admission import admission, prices_cached
 from models import StockHistoryResponse, StockPrice
 
 router = APIRouter(
@@ -15,7 +16,11 @@ async def get_available_stocks():
     """Get a list of all available stocks with their symbols and names."""
     return await StockService.get_available_stocks()
 
-@router.get("/{symbol}/history", response_model=StockHistoryResponse)
+@router.get(
+    "/{symbol}/history",
+    response_model=StockHistoryResponse,
+    dependencies=[Depends(admission("stocks", limit=4, is_cached=prices_cached()))]
+)
 async def get_stock_history(
     symbol: str,
     period: str = Query("6M", description="Time period: 1M, 3M, 6M, 1Y, 2Y, 5Y"),
@@ -30,20 +35,10 @@ async def get_stock_history(
     
     # Convert period to actual dates if custom dates not provided
     if not (start_date and end_date):
-        end_date = datetime.now()
-        date_ranges = {
-            "1M": 30,
-            "3M": 90,
-            "6M": 180,
-            "1Y": 365,
-            "2Y": 730,
-            "5Y": 1825
-        }
-        
-        if period not in date_ranges:
-            raise HTTPException(status_code=400, detail=f"Invalid period: {period}")
-            
-        start_date = end_date - timedelta(days=date_ranges[period])
+        try:
+            start_date, end_date = StockService.get_date_range(period)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     try:
         df = await StockService.get_stock_data(symbol, start_date, end_date)
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException
 from services.stock_service import StockService
 from services.technical_service import TechnicalService
+from services.admission import admission, prices_cached
 from models import TechnicalIndicators
 
 router = APIRouter(
     prefix="/technical",
     tags=["technical"],
-    responses={404: {"description": "Not found"}}
+    responses={404: {"description": "Not found"}},
+    dependencies=[Depends(admission("technical", limit=4, is_cached=prices_cached()))]
 )
 
 @router.get("/indicators/{symbol}", response_model=TechnicalIndicators)
@@ -22,27 +23,8 @@ async def get_technical_indicators(
         raise HTTPException(status_code=404, detail=f"Stock with symbol {symbol} not found")
     
     try:
-        # Convert period to actual dates
-        end_date = datetime.now()
-        date_ranges = {
-            "1M": 30,
-            "3M": 90,
-            "6M": 180,
-            "1Y": 365,
-            "2Y": 730,
-            "5Y": 1825
-        }
-        
-        if period not in date_ranges:
-            raise HTTPException(status_code=400, detail=f"Invalid period: {period}")
-            
-        start_date = end_date - timedelta(days=date_ranges[period])
-        
-        # Get stock data
-        df = await StockService.get_stock_data(symbol, start_date, end_date)
-        
         # Calculate technical indicators
-        indicators = await TechnicalService.calculate_technical_indicators(df)
+        indicators = await TechnicalService.get_technical_indicators(symbol, period)
         
         return TechnicalIndicators(
             symbol=symbol,
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends
-from firebase_admin import firestore
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from services.auth_service import verify_firebase_token
 from services.stock_service import StockService
+from services.executor import run_upstream
+from services.firebase_app import get_firestore
 import logging
 
 router = APIRouter(
@@ -31,34 +32,23 @@ class UserPortfolio(BaseModel):
 @router.get("/", response_model=UserPortfolio)
 async def get_user_portfolio(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get the current user's portfolio"""
-    try:
-        logger.info("Portfolio request received")
-        
-        # Check if credentials are provided
-        if not credentials:
-            logger.error("No credentials provided")
-            raise HTTPException(status_code=401, detail="No credentials provided")
-            
-        logger.info(f"Authorization header received with token length: {len(credentials.credentials)}")
-        
-        # Verify token and get user ID
-        user_id = await verify_firebase_token(credentials.credentials)
-        
-        logger.info(f"Fetching portfolio for user: {user_id}")
-        # Access Firestore
-        db = firestore.client()
-        portfolio_ref = db.collection('portfolios').document(user_id)
-        portfolio = portfolio_ref.get()
-        
-        if not portfolio.exists:
-            logger.info(f"No portfolio found for user: {user_id}, returning empty portfolio")
-            return UserPortfolio(stocks=[])
-        
-        logger.info(f"Successfully retrieved portfolio for user: {user_id}")
-        return UserPortfolio(stocks=portfolio.to_dict().get('stocks', []))
-    except Exception as e:
-        logger.error(f"Error in get_user_portfolio: {str(e)}")
-        raise
+    # Check if credentials are provided
+    if not credentials:
+        raise HTTPException(status_code=401, detail="No credentials provided")
+    
+    # Verify token and get user ID
+    user_id = await verify_firebase_token(credentials.credentials)
+    
+    # Access Firestore
+    db = get_firestore()
+    portfolio_ref = db.collection('portfolios').document(user_id)
+    portfolio = await run_upstream("firestore", "get", portfolio_ref.get)
+    
+    if not portfolio.exists:
+        logger.debug("No portfolio found for user %s", user_id)
+        return UserPortfolio(stocks=[])
+    
+    return UserPortfolio(stocks=portfolio.to_dict().get('stocks', []))
 
 @router.post("/", response_model=UserPortfolio)
 async def update_user_portfolio(
@@ -80,9 +70,9 @@ async def update_user_portfolio(
         raise HTTPException(status_code=400, detail=f"Total allocation must be 100%, got {total_allocation}%")
     
     # Update in Firestore
-    db = firestore.client()
+    db = get_firestore()
     portfolio_ref = db.collection('portfolios').document(user_id)
-    portfolio_ref.set({'stocks': [stock.dict() for stock in portfolio.stocks]})
+    await run_upstream("firestore", "set", portfolio_ref.set, {'stocks': [stock.dict() for stock in portfolio.stocks]})
     
     return portfolio
 
@@ -100,9 +90,9 @@ async def add_stock_to_portfolio(
         raise HTTPException(status_code=400, detail=f"Invalid stock symbol: {stock.symbol}")
     
     # Get current portfolio
-    db = firestore.client()
+    db = get_firestore()
     portfolio_ref = db.collection('portfolios').document(user_id)
-    portfolio = portfolio_ref.get()
+    portfolio = await run_upstream("firestore", "get", portfolio_ref.get)
     
     current_stocks = []
     if portfolio.exists:
@@ -113,12 +103,12 @@ async def add_stock_to_portfolio(
         if existing_stock['symbol'] == stock.symbol:
             # Update existing stock
             current_stocks[i] = stock.dict()
-            portfolio_ref.set({'stocks': current_stocks})
+            await run_upstream("firestore", "set", portfolio_ref.set, {'stocks': current_stocks})
             return UserPortfolio(stocks=current_stocks)
     
     # Add new stock
     current_stocks.append(stock.dict())
-    portfolio_ref.set({'stocks': current_stocks})
+    await run_upstream("firestore", "set", portfolio_ref.set, {'stocks': current_stocks})
     
     return UserPortfolio(stocks=current_stocks)
 
@@ -131,9 +121,9 @@ async def remove_stock_from_portfolio(
     user_id = await verify_firebase_token(credentials.credentials)
     
     # Get current portfolio
-    db = firestore.client()
+    db = get_firestore()
     portfolio_ref = db.collection('portfolios').document(user_id)
-    portfolio = portfolio_ref.get()
+    portfolio = await run_upstream("firestore", "get", portfolio_ref.get)
     
     if not portfolio.exists:
         raise HTTPException(status_code=404, detail="Portfolio not found")
@@ -147,7 +137,7 @@ async def remove_stock_from_portfolio(
         raise HTTPException(status_code=404, detail=f"Stock {symbol} not found in portfolio")
     
     # Update in Firestore
-    portfolio_ref.set({'stocks': updated_stocks})
+    await run_upstream("firestore", "set", portfolio_ref.set, {'stocks': updated_stocks})
     
     return UserPortfolio(stocks=updated_stocks)
 
@@ -159,9 +149,9 @@ async def get_portfolio_performance(
     user_id = await verify_firebase_token(credentials.credentials)
     
     # Get user portfolio
-    db = firestore.client()
+    db = get_firestore()
     portfolio_ref = db.collection('portfolios').document(user_id)
-    portfolio = portfolio_ref.get()
+    portfolio = await run_upstream("firestore", "get", portfolio_ref.get)
     
     if not portfolio.exists or not portfolio.to_dict().get('stocks'):
         raise HTTPException(status_code=404, detail="Portfolio not found or empty")
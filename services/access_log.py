@@ -0,0 +1,150 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+from services.metrics import upstream_timings
+
+access_logger = logging.getLogger("mefic.access")
+
+# Fraction of successful requests written to the access log; errors and slow requests are always kept
+SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+SLOW_REQUEST_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+
+# Level of the access records of each route template, e.g. "/metrics=DEBUG,/health=DEBUG"
+ROUTE_LEVELS = os.getenv("ACCESS_LOG_ROUTE_LEVELS", "/metrics=DEBUG,/health=DEBUG")
+
+_listener: Optional[QueueListener] = None
+# Root handlers replaced by setup_logging, put back by stop_logging
+_previous_handlers: List[logging.Handler] = []
+
+def _parse_route_levels(spec: str) -> Dict[str, int]:
+    levels = {}
+    for item in spec.split(","):
+        route, _, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if route.strip() and isinstance(value, int):
+            levels[route.strip()] = value
+    return levels
+
+route_levels = _parse_route_levels(ROUTE_LEVELS)
+
+class StructuredFormatter(logging.Formatter):
+    """Render access records as one JSON object per line and other records as plain text."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "access", None)
+        if fields is None:
+            return super().format(record)
+        
+        return json.dumps({
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            **fields
+        })
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records as they are, so the listener thread formats them instead of the request."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging(level: int = logging.INFO) -> None:
+    """Send all log records through a queue to a background thread that formats and writes them."""
+    global _listener, _previous_handlers
+    if _listener is not None:
+        return
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    
+    root = logging.getLogger()
+    _previous_handlers = root.handlers
+    root.handlers = [DeferredQueueHandler(records)]
+    root.setLevel(level)
+
+def stop_logging() -> None:
+    """Write out the queued records, stop the background thread and restore the root handlers."""
+    global _listener
+    if _listener is not None:
+        # Records logged from here on go straight to the previous handlers
+        logging.getLogger().handlers = _previous_handlers
+        _listener.stop()
+        _listener = None
+        atexit.unregister(stop_logging)
+
+class AccessLogMiddleware:
+    """ASGI middleware writing one structured access record per request."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response = {"status": 500, "bytes": 0}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+        
+        # Share the upstream timings with the metrics middleware if it already collects them
+        timings = upstream_timings.get()
+        token = upstream_timings.set({}) if timings is None else None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            timings = upstream_timings.get()
+            if token is not None:
+                upstream_timings.reset(token)
+            self._log(scope, response, duration_ms, timings)
+    
+    @staticmethod
+    def _log(scope, response: Dict, duration_ms: float, timings: Dict[str, float]) -> None:
+        route = getattr(scope.get("route"), "path", "unmatched")
+        status = response["status"]
+        
+        if status >= 500:
+            level = logging.ERROR
+        else:
+            level = route_levels.get(route, logging.INFO)
+        if not access_logger.isEnabledFor(level):
+            return
+        
+        # Sample ordinary requests, but keep every failure and slow request
+        sampled = status < 400 and duration_ms < SLOW_REQUEST_MS
+        if sampled and random.random() >= SAMPLE_RATE:
+            return
+        
+        access_logger.log(
+            level,
+            "%s %s %d %.1fms",
+            scope["method"], scope["path"], status, duration_ms,
+            extra={"access": {
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "upstream_ms": {provider: round(seconds * 1000, 2) for provider, seconds in timings.items()},
+                "response_bytes": response["bytes"],
+                "sample_rate": SAMPLE_RATE if sampled else 1.0,
+            }}
+        )
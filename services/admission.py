@@ -0,0 +1,169 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from fastapi import HTTPException, Request
+from services.deadline import request_deadline
+from services.metrics import registry
+from services.stock_service import StockService, BENCHMARK_SYMBOL, HISTORY_DAYS, price_cache
+from services.financial_service import fundamentals_cache
+from services.fundamentals_store import fundamentals_store
+
+ADMISSION_WAITING = registry.gauge(
+    "mefic_admission_waiting", "Requests waiting for an upstream slot by route.", ["route"]
+)
+ADMISSION_REJECTED = registry.counter(
+    "mefic_admission_rejected_total", "Requests shed by admission control by route and reason.", ["route", "reason"]
+)
+ADMISSION_BYPASSED = registry.counter(
+    "mefic_admission_bypassed_total", "Requests served from cache without admission by route.", ["route"]
+)
+
+# Longest time a request may spend queueing and calling upstream; clients can ask for less
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "10"))
+TIMEOUT_HEADER = "x-request-timeout"
+
+CachePredicate = Callable[[Request], Awaitable[bool]]
+
+class AdmissionController:
+    """
+    Limits how many requests of a route may wait on upstream data at once.
+    
+    Up to `limit` requests run concurrently and up to `queue_size` more wait for a
+    slot until their deadline. Anything beyond that is rejected straight away with
+    503 and a Retry-After estimated from recent service times.
+    """
+    
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.waiting = 0
+        self.service_time = 1.0
+        self._semaphore = asyncio.Semaphore(limit)
+    
+    def retry_after(self) -> int:
+        """Estimate in whole seconds when a slot should be free again."""
+        return max(1, math.ceil(self.service_time * (self.waiting + 1) / self.limit))
+    
+    def _reject(self, reason: str) -> None:
+        ADMISSION_REJECTED.inc(route=self.name, reason=reason)
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many {self.name} requests, try again later",
+            headers={"Retry-After": str(self.retry_after())}
+        )
+    
+    @asynccontextmanager
+    async def admit(self, timeout: float) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block, waiting at most `timeout` seconds for it."""
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending
+            await self._semaphore.acquire()
+        elif self.waiting >= self.queue_size:
+            self._reject("queue_full")
+        else:
+            self.waiting += 1
+            ADMISSION_WAITING.set(self.waiting, route=self.name)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self._reject("deadline")
+            finally:
+                self.waiting -= 1
+                ADMISSION_WAITING.set(self.waiting, route=self.name)
+        
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+            # Moving average of how long a request holds its slot
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - start)
+
+def _request_timeout(request: Request) -> float:
+    """Time budget of a request, shortened by the client's own timeout if it sent one."""
+    try:
+        return min(REQUEST_TIMEOUT, float(request.headers[TIMEOUT_HEADER]))
+    except (KeyError, ValueError):
+        return REQUEST_TIMEOUT
+
+def admission(
+    name: str,
+    limit: int,
+    queue_size: Optional[int] = None,
+    is_cached: Optional[CachePredicate] = None
+) -> Callable[[Request], AsyncIterator[None]]:
+    """
+    Create a dependency that puts a route behind admission control.
+    
+    Requests the cache can answer skip the queue. The others get a deadline, which
+    upstream calls made on their behalf respect, and wait for one of `limit` slots.
+    """
+    controller = AdmissionController(name, limit, queue_size if queue_size is not None else limit * 4)
+    
+    async def dependency(request: Request) -> AsyncIterator[None]:
+        if is_cached is not None and await is_cached(request):
+            ADMISSION_BYPASSED.inc(route=name)
+            yield
+            return
+        
+        timeout = _request_timeout(request)
+        token = request_deadline.set(time.monotonic() + timeout)
+        try:
+            async with controller.admit(timeout):
+                yield
+        finally:
+            request_deadline.reset(token)
+    
+    return dependency
+
+async def _request_symbols(request: Request) -> List[str]:
+    """Symbols a request is about: the path symbol, the `symbols` query or the whole universe."""
+    symbol = request.path_params.get("symbol")
+    if symbol:
+        return [symbol]
+    
+    symbols = request.query_params.get("symbols")
+    if symbols:
+        return [symbol.strip() for symbol in symbols.split(",") if symbol.strip()]
+    return list(await StockService.get_available_stocks())
+
+def prices_cached(benchmark: bool = False) -> CachePredicate:
+    """Predicate for routes computed from cached price histories."""
+    async def predicate(request: Request) -> bool:
+        # Ranges older than the cached history always go upstream
+        start_date = request.query_params.get("start_date")
+        if start_date:
+            try:
+                if datetime.fromisoformat(start_date).replace(tzinfo=None) < datetime.now() - timedelta(days=HISTORY_DAYS):
+                    return False
+            except ValueError:
+                return False
+        
+        symbols = await _request_symbols(request)
+        if benchmark:
+            symbols.append(BENCHMARK_SYMBOL)
+        return all(price_cache.contains(symbol) for symbol in symbols)
+    
+    return predicate
+
+async def fundamentals_cached(request: Request) -> bool:
+    """Predicate for routes computed from stored or cached fundamentals."""
+    for symbol in await _request_symbols(request):
+        if await fundamentals_store.get_latest(symbol) is None and not fundamentals_cache.contains(symbol):
+            return False
+    return True
+
+def all_cached(*predicates: CachePredicate) -> CachePredicate:
+    """Predicate that holds when every given predicate does."""
+    async def predicate(request: Request) -> bool:
+        for check in predicates:
+            if not await check(request):
+                return False
+        return True
+    
+    return predicate
@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional
+from services.stock_service import StockService
+from services.technical_service import TechnicalService, indicator_cache
+from services.risk_service import RiskService, risk_cache
+from services.portfolio_service import PortfolioService, portfolio_cache
+from services.financial_service import FinancialService
+from services.lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# Sections that can be requested from the analysis endpoint
+ANALYSIS_SECTIONS = ("technical", "risk", "portfolio", "financial")
+
+class AnalysisService:
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> List[str]:
+        """Parse a comma-separated list of analysis sections, defaulting to all of them."""
+        if not fields:
+            return list(ANALYSIS_SECTIONS)
+        
+        sections = [field.strip().lower() for field in fields.split(",") if field.strip()]
+        invalid = [section for section in sections if section not in ANALYSIS_SECTIONS]
+        if invalid:
+            raise ValueError(f"Invalid fields: {', '.join(invalid)}")
+        return sections
+    
+    @staticmethod
+    async def get_analysis(symbol: str, period: str, sections: List[str]) -> Dict[str, Dict]:
+        """
+        Calculate the requested analysis sections for a stock from a single data fetch.
+        
+        Sections already computed from the same data are served from cache. For the
+        rest, prices and the market benchmark are loaded once and daily returns are
+        computed once, then shared by the technical, risk and portfolio calculations.
+        
+        Returns:
+            Dictionary keyed by section name with the metrics of each section
+        """
+        start_date, end_date = StockService.get_date_range(period)
+        result = {}
+        pending = []
+        
+        metric_sections = [section for section in ("technical", "risk", "portfolio") if section in sections]
+        if metric_sections:
+            # Reuse results already computed from the same data
+            version = await StockService.get_data_version(symbol, period)
+            keys = {"technical": version}
+            if {"risk", "portfolio"} & set(sections):
+                benchmark_version = await StockService.get_benchmark_version()
+                keys["risk"] = keys["portfolio"] = (version, benchmark_version)
+            caches = {"technical": indicator_cache, "risk": risk_cache, "portfolio": portfolio_cache}
+            
+            for section in metric_sections:
+                cached = caches[section].get(keys[section])
+                if cached is not None:
+                    result[section] = dict(cached)
+            pending = [section for section in metric_sections if section not in result]
+        
+        if pending:
+            # Get stock data and daily returns once
+            df = await StockService.get_stock_data(symbol, start_date, end_date)
+            returns = StockService.get_daily_returns(df['Close'])
+            
+            market_returns = None
+            if {"risk", "portfolio"} & set(pending):
+                try:
+                    # Same benchmark window as the single-section endpoints, so results can be shared
+                    market = await StockService.get_benchmark_data(df.index[0], df.index[-1] + pd.Timedelta(days=1))
+                    market_returns = StockService.get_daily_returns(market)
+                except ValueError as e:
+                    # Risk metrics can fall back to a neutral beta, portfolio metrics cannot
+                    if "portfolio" in pending:
+                        raise ValueError(f"Error fetching market data: {str(e)}")
+            
+            try:
+                computed = {}
+                if "technical" in pending:
+                    computed["technical"] = TechnicalService.compute_technical_indicators(df['Close'])
+                if "risk" in pending:
+                    computed["risk"] = RiskService.compute_risk_metrics(returns, market_returns)
+                if "portfolio" in pending:
+                    computed["portfolio"] = PortfolioService.compute_portfolio_metrics(returns, market_returns)
+            except Exception as e:
+                raise ValueError(f"Error calculating analysis: {str(e)}")
+            
+            for section, metrics in computed.items():
+                caches[section].set(keys[section], metrics)
+                result[section] = dict(metrics)
+        
+        if "financial" in sections:
+            result["financial"] = await FinancialService.get_financial_metrics(symbol)
+        
+        return result
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Hashable, Optional
+from services.deadline import remaining_time
+from services.metrics import CACHE_REQUESTS
+from services.shared_cache import SharedCache, shared_cache
+
+# How long a worker waits for another worker on the host to load a key
+SINGLE_FLIGHT_TIMEOUT = 15.0
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+class TTLCache:
+    """
+    In-process cache whose entries expire at an absolute time.
+    
+    Expired entries are kept until they are evicted by size, so the last good value
+    can still be served while upstream is unavailable. When a shared cache is
+    configured it backs this one, so values loaded by one worker are reused by
+    every other worker on the host.
+    """
+    
+    def __init__(self, name: str, maxsize: int = 1024, shared: Optional[SharedCache] = shared_cache):
+        self.name = name
+        self.maxsize = maxsize
+        self.shared = shared
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+    
+    def _shared_key(self, key: Hashable) -> str:
+        return f"{self.name}:{key!r}"
+    
+    def _store(self, key: Hashable, value: Any, expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        
+        # Drop the oldest entries once the cache is full
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def _load_shared(self, key: Hashable) -> Optional[tuple]:
+        """Copy an entry from the shared cache into this process."""
+        if self.shared is None:
+            return None
+        
+        entry = self.shared.get(self._shared_key(key))
+        if entry is not None:
+            self._store(key, *entry)
+        return entry
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a key, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return entry[0]
+        
+        entry = self._load_shared(key)
+        if entry is not None and entry[1] > time.time():
+            CACHE_REQUESTS.inc(cache=self.name, result="shared_hit")
+            return entry[0]
+        
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return None
+    
+    def contains(self, key: Hashable) -> bool:
+        """Check whether a fresh value is cached for a key, without loading it."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            return True
+        return self.shared is not None and self.shared.is_fresh(self._shared_key(key))
+    
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Return the last stored value for a key, even if it has expired."""
+        entry = self._entries.get(key) or self._load_shared(key)
+        if entry is None:
+            return None
+        
+        CACHE_REQUESTS.inc(cache=self.name, result="stale")
+        return entry[0]
+    
+    def set(self, key: Hashable, value: Any, expires_at: datetime) -> None:
+        """Store a value until the given expiry time."""
+        self._store(key, value, expires_at.timestamp())
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, expires_at.timestamp())
+    
+    def clear(self) -> None:
+        """Remove all entries held in this process."""
+        self._entries.clear()
+    
+    @asynccontextmanager
+    async def single_flight(self, key: Hashable) -> AsyncIterator[None]:
+        """
+        Let only one caller on the host load a key at a time.
+        
+        Other callers wait until the value is published or the wait times out, so
+        they should check the cache again once inside the block.
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if self.shared is None:
+                yield
+                return
+            
+            lease_key = self._shared_key(key)
+            budget = remaining_time()
+            deadline = time.monotonic() + (SINGLE_FLIGHT_TIMEOUT if budget is None else min(SINGLE_FLIGHT_TIMEOUT, budget))
+            # Taking a lease can wait for the database lock, so keep it off the event loop
+            owned = await asyncio.to_thread(self.shared.acquire_lease, lease_key, SINGLE_FLIGHT_TIMEOUT)
+            while not owned and time.monotonic() < deadline:
+                await asyncio.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+                if self.shared.is_fresh(lease_key):
+                    break
+                owned = await asyncio.to_thread(self.shared.acquire_lease, lease_key, SINGLE_FLIGHT_TIMEOUT)
+            
+            try:
+                yield
+            finally:
+                if owned:
+                    self.shared.release_lease(lease_key)
+
+class LRUCache:
+    """
+    In-process cache for results computed from a given version of the input data.
+    
+    Entries never expire: keys include the data version, so new data gets new keys
+    and the least recently used entries are evicted once the cache is full.
+    """
+    
+    def __init__(self, name: str, maxsize: int = 4096):
+        self.name = name
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for a key, or None if it is missing."""
+        value = self._entries.get(key)
+        if value is None:
+            CACHE_REQUESTS.inc(cache=self.name, result="miss")
+            return None
+        
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="hit")
+        return value
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries once full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
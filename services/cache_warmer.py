@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import random
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+from services.market_calendar import MARKET_TIMEZONE, MarketCalendar
+from services.stock_service import StockService, BENCHMARK_SYMBOL, PERIOD_DAYS
+from services.financial_service import FinancialService
+from services.technical_service import TechnicalService
+from services.risk_service import RiskService
+from services.portfolio_service import PortfolioService
+from services.screener_service import ScreenerService
+from services.fundamentals_store import fundamentals_store
+from services.shared_cache import shared_cache
+
+logger = logging.getLogger(__name__)
+
+WARMER_LEASE = "cache_warmer"
+
+class CacheWarmer:
+    """
+    Background job that refreshes cached market data after each Tadawul close.
+    
+    Prices, the benchmark, fundamentals, technical, risk and portfolio metrics and screener scores
+    are refreshed for the whole universe so user requests hit warm data. With a
+    shared cache only one worker per host runs each refresh; the others read its results.
+    """
+    
+    def __init__(self, concurrency: int = 4, retries: int = 3, retry_delay: float = 2.0):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _with_retries(self, name: str, func: Callable[[], Awaitable]) -> bool:
+        """Run an upstream call, retrying with jittered exponential backoff."""
+        for attempt in range(self.retries):
+            try:
+                await func()
+                return True
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    logger.warning("Cache warm-up of %s failed: %s", name, e)
+                    return False
+                
+                # Spread retries out so workers do not hit upstream in lockstep
+                delay = self.retry_delay * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+        return False
+    
+    @staticmethod
+    async def _fundamentals_fresh(symbols: List[str]) -> bool:
+        """Check whether the latest snapshot covers every stock and has not expired yet."""
+        latest, version = await fundamentals_store.latest(), await fundamentals_store.version()
+        if latest is None or version is None or any(symbol not in latest for symbol in symbols):
+            return False
+        
+        # A snapshot expires like any market data fetched when it was written
+        written_at = datetime.fromtimestamp(version[1], MARKET_TIMEZONE)
+        return MarketCalendar.data_expiry(written_at) > MarketCalendar.now()
+    
+    async def refresh(self, force: bool = True) -> None:
+        """
+        Refresh all cached data for the available stocks.
+        
+        Without force only missing or expired data is fetched, e.g. on startup when
+        another process may already have warmed the caches.
+        """
+        symbols = list(await StockService.get_available_stocks())
+        # Prices and the benchmark in one bulk download
+        await self._with_retries(
+            "prices", lambda: StockService.prefetch_histories(symbols + [BENCHMARK_SYMBOL], refresh=force)
+        )
+        
+        # Fundamentals of the whole universe, stored as today's snapshot
+        if force or not await self._fundamentals_fresh(symbols):
+            await self._with_retries(
+                "fundamentals", lambda: FinancialService.ingest_fundamentals(symbols, self.concurrency)
+            )
+        
+        # Metrics are computed from the cached prices and keyed by their version,
+        # so fresh bars get fresh entries
+        for symbol in symbols:
+            for period in PERIOD_DAYS:
+                await self._with_retries(
+                    f"indicators of {symbol} ({period})",
+                    lambda symbol=symbol, period=period: TechnicalService.get_technical_indicators(symbol, period)
+                )
+                await self._with_retries(
+                    f"risk metrics of {symbol} ({period})",
+                    lambda symbol=symbol, period=period: RiskService.get_risk_metrics(symbol, period)
+                )
+                await self._with_retries(
+                    f"portfolio metrics of {symbol} ({period})",
+                    lambda symbol=symbol, period=period: PortfolioService.get_portfolio_metrics(symbol, period)
+                )
+        
+        # Screener scores with the default weights
+        await self._with_retries("screener", lambda: ScreenerService.get_screener_index(refresh=force))
+        
+        logger.info("Cache warm-up finished for %d stocks", len(symbols))
+    
+    async def _elect(self, delay: float) -> bool:
+        """Claim this refresh round for the current worker, holding it until the next one."""
+        if shared_cache is None:
+            return True
+        return await asyncio.to_thread(shared_cache.acquire_lease, WARMER_LEASE, max(delay, 600))
+    
+    async def run(self) -> None:
+        """Warm the cache on startup, then refresh it after every market close."""
+        # The startup pass only fills in what is missing or expired
+        force = False
+        while True:
+            next_refresh = MarketCalendar.next_refresh_time()
+            delay = (next_refresh - MarketCalendar.now()).total_seconds()
+            
+            if await self._elect(delay):
+                try:
+                    await self.refresh(force=force)
+                except Exception:
+                    logger.exception("Cache warm-up failed")
+            else:
+                logger.info("Cache warm-up is running in another worker")
+            force = True
+            
+            # Sleep until the next session has closed
+            next_refresh = MarketCalendar.next_refresh_time()
+            delay = (next_refresh - MarketCalendar.now()).total_seconds()
+            logger.info("Next cache warm-up at %s", next_refresh.isoformat())
+            await asyncio.sleep(max(delay, 0) + random.uniform(0, 60))
+    
+    def start(self) -> None:
+        """Start the background refresh loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+    
+    async def stop(self) -> None:
+        """Stop the background refresh loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+cache_warmer = CacheWarmer()
@@ -0,0 +1,13 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Monotonic time by which the current request must be answered
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current request's deadline, or None outside a request with one."""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
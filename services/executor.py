@@ -0,0 +1,54 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from services.metrics import (
+    EXECUTOR_QUEUE_DEPTH, UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, upstream_timings
+)
+
+# Worker threads for blocking upstream calls (yfinance, Firestore, Firebase Auth)
+UPSTREAM_WORKERS = 16
+
+_executor = ThreadPoolExecutor(max_workers=UPSTREAM_WORKERS, thread_name_prefix="upstream")
+
+async def run_upstream(provider: str, operation: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking upstream call in the worker pool without blocking the event loop.
+    
+    Records the call's latency, errors and concurrency per provider, and adds the time
+    spent waiting for it to the current request's upstream timings.
+    """
+    lock = threading.Lock()
+    state = {"queued": True}
+    EXECUTOR_QUEUE_DEPTH.inc()
+    
+    def leave_queue() -> None:
+        with lock:
+            if state["queued"]:
+                state["queued"] = False
+                EXECUTOR_QUEUE_DEPTH.dec()
+    
+    def call():
+        leave_queue()
+        UPSTREAM_IN_FLIGHT.inc(provider=provider)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            UPSTREAM_ERRORS.inc(provider=provider, operation=operation)
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, provider=provider, operation=operation)
+            UPSTREAM_IN_FLIGHT.dec(provider=provider)
+    
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, call)
+    finally:
+        # A call cancelled before it started never leaves the queue by itself
+        leave_queue()
+        
+        timings = upstream_timings.get()
+        if timings is not None:
+            timings[provider] = timings.get(provider, 0.0) + time.perf_counter() - start
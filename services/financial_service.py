@@ -1,36 +1,120 @@
-import yfinance as yf
-from typing import Dict, Optional
+import asyncio
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+from services.cache import TTLCache
+from services.fundamentals_store import FundamentalsSnapshot, fundamentals_store
+from services.market_calendar import MarketCalendar
+from services.market_data import market_data, UpstreamUnavailableError
+
+logger = logging.getLogger(__name__)
+
+fundamentals_cache = TTLCache("fundamentals")
 
 class FinancialService:
     @staticmethod
-    async def get_financial_metrics(symbol: str) -> Dict[str, Optional[float]]:
-        """Get key financial metrics for a stock."""
-        try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            
-            # Extract metrics
-            metrics = {
-                "pe_ratio": info.get("trailingPE"),
-                "roe": info.get("returnOnEquity", 0) * 100 if info.get("returnOnEquity") else None,
-                "roa": info.get("returnOnAssets", 0) * 100 if info.get("returnOnAssets") else None,
-                "dividend_yield": info.get("dividendYield", 0) * 100 if info.get("dividendYield") else None,
-                "payout_ratio": info.get("payoutRatio", 0) * 100 if info.get("payoutRatio") else None,
-            }
+    def extract_metrics(info: Dict) -> Dict[str, Optional[float]]:
+        """Extract key financial metrics from a provider's info dictionary."""
+        # Extract metrics
+        metrics = {
+            "pe_ratio": info.get("trailingPE"),
+            "roe": info.get("returnOnEquity", 0) * 100 if info.get("returnOnEquity") else None,
+            "roa": info.get("returnOnAssets", 0) * 100 if info.get("returnOnAssets") else None,
+            "dividend_yield": info.get("dividendYield", 0) * 100 if info.get("dividendYield") else None,
+            "payout_ratio": info.get("payoutRatio", 0) * 100 if info.get("payoutRatio") else None,
+            "sector": info.get("sector"),
+        }
+        
+        # Calculate custom dividend score (simplified example)
+        if metrics["dividend_yield"] and metrics["payout_ratio"]:
+            # Simple scoring: higher yield and sustainable payout ratio (not too high) is better
+            div_score = min(100, metrics["dividend_yield"] * 10)
+            if metrics["payout_ratio"] > 80:
+                div_score *= 0.8  # Penalize very high payout ratios
+            metrics["dividend_score"] = div_score
+        else:
+            metrics["dividend_score"] = None
+        
+        return metrics
+    
+    @staticmethod
+    async def get_financial_metrics(symbol: str, refresh: bool = False) -> Dict[str, Optional[float]]:
+        """
+        Get key financial metrics for a stock.
+        
+        Metrics come from the latest stored snapshot. Stocks missing from the store,
+        e.g. before the first ingestion has run, are fetched from upstream.
+        """
+        stored = None if refresh else await fundamentals_store.get_latest(symbol)
+        if stored is not None:
+            return stored
+        
+        cached = None if refresh else fundamentals_cache.get(symbol)
+        if cached is not None:
+            return dict(cached)
+        
+        async with fundamentals_cache.single_flight(symbol):
+            # Another worker may have fetched them while we waited
+            cached = None if refresh else fundamentals_cache.get(symbol)
+            if cached is not None:
+                return dict(cached)
             
-            # Calculate custom dividend score (simplified example)
-            if metrics["dividend_yield"] and metrics["payout_ratio"]:
-                # Simple scoring: higher yield and sustainable payout ratio (not too high) is better
-                div_score = min(100, metrics["dividend_yield"] * 10)
-                if metrics["payout_ratio"] > 80:
-                    div_score *= 0.8  # Penalize very high payout ratios
-                metrics["dividend_score"] = div_score
-            else:
-                metrics["dividend_score"] = None
-                
-            return metrics
+            return await FinancialService._fetch_financial_metrics(symbol)
+    
+    @staticmethod
+    async def _fetch_financial_metrics(symbol: str) -> Dict[str, Optional[float]]:
+        """Fetch financial metrics from upstream and cache them."""
+        try:
+            info = await market_data.info(symbol)
+        except UpstreamUnavailableError as e:
+            # Serve the last good metrics rather than failing
+            stale = fundamentals_cache.get_stale(symbol)
+            if stale is None:
+                raise
+            logger.warning("Serving stale fundamentals for %s: %s", symbol, e)
+            return dict(stale)
         except Exception as e:
             raise ValueError(f"Error fetching financial metrics: {str(e)}")
+        
+        try:
+            metrics = FinancialService.extract_metrics(info)
+        except Exception as e:
+            raise ValueError(f"Error fetching financial metrics: {str(e)}")
+        
+        fundamentals_cache.set(symbol, metrics, MarketCalendar.data_expiry())
+        return dict(metrics)
+    
+    @staticmethod
+    async def ingest_fundamentals(symbols: List[str], concurrency: int = 4) -> FundamentalsSnapshot:
+        """
+        Fetch fundamentals for many stocks in parallel and store them as today's snapshot.
+        
+        Stocks whose fetch fails are left out of the snapshot; readers fall back to
+        the most recent snapshot that has them.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def fetch(symbol: str) -> Optional[Dict[str, Optional[float]]]:
+            async with semaphore:
+                try:
+                    return FinancialService.extract_metrics(await market_data.info(symbol))
+                except Exception as e:
+                    logger.warning("Fetching fundamentals of %s failed: %s", symbol, e)
+                    return None
+        
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols))
+        metrics = {symbol: result for symbol, result in zip(symbols, results) if result is not None}
+        if not metrics:
+            raise ValueError("No fundamentals could be fetched")
+        
+        snapshot = await fundamentals_store.write(MarketCalendar.now().date(), metrics)
+        logger.info("Stored fundamentals of %d of %d stocks for %s", len(metrics), len(symbols), snapshot.day)
+        return snapshot
+    
+    @staticmethod
+    async def get_financial_history(symbol: str, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[Dict]:
+        """Get the stored daily snapshots of a stock's financial metrics, oldest first."""
+        return [{"date": day, **metrics} for day, metrics in await fundamentals_store.history(symbol, start_date, end_date)]
     
     @staticmethod
     async def get_all_stocks_comparison(stock_dict: Dict[str, str]) -> list:
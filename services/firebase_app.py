@@ -0,0 +1,43 @@
+import json
+import threading
+from typing import Dict
+
+# Service account key of the Firebase project
+CREDENTIALS_PATH = "credentials.json"
+
+_lock = threading.Lock()
+
+def get_project_id() -> str:
+    """Read the Firebase project ID without loading the Firebase SDK."""
+    with open(CREDENTIALS_PATH) as f:
+        return json.load(f)["project_id"]
+
+def initialize_firebase() -> None:
+    """Initialize the default Firebase app once. Safe to call from any thread."""
+    import firebase_admin
+    from firebase_admin import credentials
+    
+    with _lock:
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(CREDENTIALS_PATH)
+            firebase_admin.initialize_app(cred)
+
+def get_firestore():
+    """Return the Firestore client of the default Firebase app."""
+    from firebase_admin import firestore
+    
+    initialize_firebase()
+    return firestore.client()
+
+def verify_id_token(token: str) -> Dict:
+    """Verify a Firebase ID token and return its decoded claims."""
+    from firebase_admin import auth
+    
+    initialize_firebase()
+    return auth.verify_id_token(token)
+
+def preload_firebase() -> None:
+    """Load the Firebase SDK and initialize the app ahead of the first request."""
+    from firebase_admin import auth, firestore  # noqa: F401
+    
+    initialize_firebase()
@@ -0,0 +1,34 @@
+"""
+Fetch fundamentals for the whole universe and store them as today's snapshot.
+
+The cache warmer runs this after every market close; run it by hand to backfill
+or refresh the store.
+
+Usage:
+    python -m services.fundamentals_ingest [--symbols 2222.SR,1180.SR] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import logging
+from services.financial_service import FinancialService
+from services.stock_service import StockService
+
+async def run(symbols: list, concurrency: int) -> None:
+    if not symbols:
+        symbols = list(await StockService.get_available_stocks())
+    
+    snapshot = await FinancialService.ingest_fundamentals(symbols, concurrency)
+    print(f"Stored fundamentals of {len(snapshot.symbols)} stocks for {snapshot.day}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Store a snapshot of fundamentals for the available stocks.")
+    parser.add_argument("--symbols", default="", help="Comma-separated symbols, defaults to all available stocks")
+    parser.add_argument("--concurrency", type=int, default=4, help="Upstream calls in flight at once")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    symbols = [symbol.strip() for symbol in args.symbols.split(",") if symbol.strip()]
+    asyncio.run(run(symbols, args.concurrency))
+
+if __name__ == "__main__":
+    main()
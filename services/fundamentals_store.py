@@ -0,0 +1,327 @@
+from __future__ import annotations
+import asyncio
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from services.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Metrics kept for every symbol in a snapshot
+FUNDAMENTAL_METRICS = ("pe_ratio", "roe", "roa", "dividend_yield", "payout_ratio", "dividend_score")
+FUNDAMENTAL_LABELS = ("sector",)
+
+# How often a process looks for snapshots written by other processes
+POLL_INTERVAL = 5.0
+
+# Parsed snapshots kept in memory; the least recently used are dropped beyond this
+MAX_LOADED_SNAPSHOTS = 32
+
+SNAPSHOT_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.npz$")
+
+def _metrics(columns: Dict[str, np.ndarray], labels: Dict[str, np.ndarray], index: int) -> Dict[str, Optional[float]]:
+    """Read the metrics at one position of metric and label columns, with None for missing values."""
+    metrics = {}
+    for metric in FUNDAMENTAL_METRICS:
+        value = columns[metric][index]
+        metrics[metric] = None if np.isnan(value) else float(value)
+    for label in FUNDAMENTAL_LABELS:
+        metrics[label] = str(labels[label][index]) or None
+    return metrics
+
+class FundamentalsSnapshot:
+    """Fundamentals of the whole universe on one day, stored column by column."""
+    
+    def __init__(self, day: date, symbols: np.ndarray, columns: Dict[str, np.ndarray], labels: Dict[str, np.ndarray]):
+        self.day = day
+        self.symbols = symbols
+        self.columns = columns
+        self.labels = labels
+        self._rows = {symbol: row for row, symbol in enumerate(symbols.tolist())}
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+    
+    def get(self, symbol: str) -> Optional[Dict[str, Optional[float]]]:
+        """Return the metrics of a symbol, with None for missing values."""
+        row = self._rows.get(symbol)
+        if row is None:
+            return None
+        return _metrics(self.columns, self.labels, row)
+
+class FundamentalsHistory:
+    """
+    Every stored snapshot stacked into one days x symbols array per metric, oldest day first.
+    
+    A symbol's history is then one column instead of one parsed file per day.
+    """
+    
+    def __init__(self, listing: Tuple[Tuple[str, float], ...], sources: List[Tuple[str, float]], snapshots: List[FundamentalsSnapshot]):
+        self.listing = listing
+        self.sources = sources
+        self.days = [snapshot.day for snapshot in snapshots]
+        
+        symbols = sorted(set().union(*(snapshot.symbols.tolist() for snapshot in snapshots)))
+        self.symbols = np.array(symbols, dtype=str)
+        self._columns = {symbol: column for column, symbol in enumerate(symbols)}
+        
+        shape = (len(snapshots), len(symbols))
+        self.present = np.zeros(shape, dtype=bool)
+        self.columns = {metric: np.full(shape, np.nan) for metric in FUNDAMENTAL_METRICS}
+        self.labels = {label: np.full(shape, "", dtype=object) for label in FUNDAMENTAL_LABELS}
+        for row, snapshot in enumerate(snapshots):
+            columns = [self._columns[symbol] for symbol in snapshot.symbols.tolist()]
+            self.present[row, columns] = True
+            for metric in FUNDAMENTAL_METRICS:
+                self.columns[metric][row, columns] = snapshot.columns[metric]
+            for label in FUNDAMENTAL_LABELS:
+                self.labels[label][row, columns] = snapshot.labels[label]
+    
+    def snapshot(self, row: int) -> FundamentalsSnapshot:
+        """Return the snapshot of one day, so it can be restacked without reading its file again."""
+        present = self.present[row]
+        return FundamentalsSnapshot(
+            self.days[row],
+            self.symbols[present],
+            {metric: values[row, present] for metric, values in self.columns.items()},
+            {label: values[row, present].astype(str) for label, values in self.labels.items()}
+        )
+    
+    def get(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[date, Dict[str, Optional[float]]]]:
+        """Return the metrics of a symbol per day between start and end, inclusive, oldest first."""
+        column = self._columns.get(symbol)
+        if column is None:
+            return []
+        
+        first = 0 if start is None else bisect_left(self.days, start)
+        last = len(self.days) if end is None else bisect_right(self.days, end)
+        rows = first + np.flatnonzero(self.present[first:last, column])
+        return self._get(rows, column)
+    
+    def get_latest(self, symbol: str) -> Optional[Dict[str, Optional[float]]]:
+        """Return the metrics of a symbol from the most recent day that has it."""
+        column = self._columns.get(symbol)
+        if column is None:
+            return None
+        
+        rows = np.flatnonzero(self.present[:, column])
+        return self._get(rows[-1:], column)[0][1] if len(rows) else None
+    
+    def _get(self, rows: np.ndarray, column: int) -> List[Tuple[date, Dict[str, Optional[float]]]]:
+        # Take the symbol's values on those days out of every column at once
+        columns = {metric: values[rows, column].tolist() for metric, values in self.columns.items()}
+        labels = {label: values[rows, column].tolist() for label, values in self.labels.items()}
+        
+        result = []
+        for index, row in enumerate(rows.tolist()):
+            metrics = {metric: None if math.isnan(values[index]) else values[index] for metric, values in columns.items()}
+            metrics.update({label: str(values[index]) or None for label, values in labels.items()})
+            result.append((self.days[row], metrics))
+        return result
+
+class FundamentalsStore:
+    """
+    Dated snapshots of fundamentals, one compressed NumPy file per day.
+    
+    Each file holds a symbols column, one float column per metric with NaN where
+    a value is missing, and one text column per label such as the sector. Files are written under a temporary name and renamed
+    into place, so readers in other processes never see a partial snapshot.
+    
+    File I/O runs in a worker thread. Lookups in the latest snapshot stay on the
+    event loop while it is parsed and the directory listing is recent. Histories are
+    served from all snapshots stacked together, restacked when the listing changes.
+    """
+    
+    def __init__(self, root: str, max_loaded: int = MAX_LOADED_SNAPSHOTS):
+        self.root = root
+        self.max_loaded = max_loaded
+        self._lock = threading.RLock()
+        self._snapshots: "OrderedDict[str, Tuple[float, FundamentalsSnapshot]]" = OrderedDict()
+        self._files: List[Tuple[date, str]] = []
+        self._listing: Tuple[Tuple[str, float], ...] = ()
+        self._stacked: Optional[FundamentalsHistory] = None
+        self._latest: Optional[Tuple[float, FundamentalsSnapshot]] = None
+        self._scanned_at = 0.0
+    
+    def _is_scan_due(self) -> bool:
+        return time.monotonic() - self._scanned_at > POLL_INTERVAL
+    
+    def _scan(self, force: bool = False) -> List[Tuple[date, str]]:
+        """List the snapshot files, newest first, re-reading the directory every POLL_INTERVAL."""
+        with self._lock:
+            if force or self._is_scan_due():
+                try:
+                    names = os.listdir(self.root)
+                except FileNotFoundError:
+                    names = []
+                
+                files = []
+                for name in names:
+                    match = SNAPSHOT_FILE.match(name)
+                    if match:
+                        files.append((date.fromisoformat(match.group(1)), name))
+                self._files = sorted(files, reverse=True)
+                
+                # Names and mtimes identify the stored data, so the stacked history knows when to restack
+                listing = []
+                for _, name in self._files:
+                    try:
+                        listing.append((name, os.stat(os.path.join(self.root, name)).st_mtime))
+                    except FileNotFoundError:
+                        continue
+                self._listing = tuple(listing)
+                
+                # Keep the newest snapshot at hand, reloading it if it was rewritten
+                self._latest = None
+                for _, name in self._files:
+                    entry = self._load(name)
+                    if entry is not None:
+                        self._latest = entry
+                        break
+                self._scanned_at = time.monotonic()
+            return self._files
+    
+    def _load(self, name: str) -> Optional[Tuple[float, FundamentalsSnapshot]]:
+        """Load a snapshot file and its mtime, reusing the parsed copy while the file is unchanged."""
+        path = os.path.join(self.root, name)
+        with self._lock:
+            try:
+                mtime = os.stat(path).st_mtime
+            except FileNotFoundError:
+                return None
+            
+            cached = self._snapshots.get(name)
+            if cached is not None and cached[0] == mtime:
+                self._snapshots.move_to_end(name)
+                return cached
+            
+            with np.load(path, allow_pickle=False) as data:
+                columns = {metric: data[metric] for metric in FUNDAMENTAL_METRICS}
+                # Snapshots written before a label was added get it empty
+                labels = {
+                    label: data[label] if label in data.files else np.full(len(data["symbols"]), "")
+                    for label in FUNDAMENTAL_LABELS
+                }
+                snapshot = FundamentalsSnapshot(date.fromisoformat(name[:-4]), data["symbols"], columns, labels)
+            
+            self._snapshots[name] = (mtime, snapshot)
+            self._snapshots.move_to_end(name)
+            while len(self._snapshots) > self.max_loaded:
+                self._snapshots.popitem(last=False)
+            return mtime, snapshot
+    
+    def _write(self, day: date, metrics: Dict[str, Dict[str, Optional[float]]]) -> FundamentalsSnapshot:
+        os.makedirs(self.root, exist_ok=True)
+        
+        symbols = sorted(metrics)
+        columns = {
+            metric: np.array(
+                [np.nan if metrics[symbol].get(metric) is None else metrics[symbol][metric] for symbol in symbols],
+                dtype=np.float64
+            )
+            for metric in FUNDAMENTAL_METRICS
+        }
+        labels = {
+            label: np.array([metrics[symbol].get(label) or "" for symbol in symbols], dtype=str)
+            for label in FUNDAMENTAL_LABELS
+        }
+        
+        # Write next to the target and rename, which is atomic on the same filesystem
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez_compressed(file, symbols=np.array(symbols, dtype=str), **columns, **labels)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, os.path.join(self.root, f"{day.isoformat()}.npz"))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        
+        self._scan(force=True)
+        return self._load(f"{day.isoformat()}.npz")[1]
+    
+    def _current_history(self) -> Optional[FundamentalsHistory]:
+        """Return the stacked history if it matches a recent directory listing."""
+        stacked = self._stacked
+        if stacked is None or self._is_scan_due() or stacked.listing != self._listing:
+            return None
+        return stacked
+    
+    def _stack(self) -> FundamentalsHistory:
+        """Stack all snapshots, only reading the files that changed since the last time."""
+        with self._lock:
+            self._scan()
+            stacked = self._current_history()
+            if stacked is not None:
+                return stacked
+            
+            previous = self._stacked
+            reusable = {} if previous is None else {source: row for row, source in enumerate(previous.sources)}
+            # Parsed snapshots may be evicted while stacking, so hold on to them first
+            loaded = dict(self._snapshots)
+            sources, snapshots = [], []
+            for name, mtime in reversed(self._listing):
+                row = reusable.get((name, mtime))
+                if row is not None:
+                    sources.append((name, mtime))
+                    snapshots.append(previous.snapshot(row))
+                    continue
+                
+                entry = loaded.get(name)
+                if entry is None or entry[0] != mtime:
+                    entry = self._load(name)
+                if entry is not None:
+                    sources.append((name, entry[0]))
+                    snapshots.append(entry[1])
+            
+            self._stacked = FundamentalsHistory(self._listing, sources, snapshots)
+            return self._stacked
+    
+    async def write(self, day: date, metrics: Dict[str, Dict[str, Optional[float]]]) -> FundamentalsSnapshot:
+        """Store the fundamentals of many symbols as the snapshot of a day, replacing any earlier one."""
+        return await asyncio.to_thread(self._write, day, metrics)
+    
+    async def _latest_entry(self) -> Optional[Tuple[float, FundamentalsSnapshot]]:
+        if self._is_scan_due():
+            await asyncio.to_thread(self._scan)
+        return self._latest
+    
+    async def latest(self) -> Optional[FundamentalsSnapshot]:
+        """Return the most recent snapshot, or None if there is none yet."""
+        entry = await self._latest_entry()
+        return None if entry is None else entry[1]
+    
+    async def get_latest(self, symbol: str) -> Optional[Dict[str, Optional[float]]]:
+        """Return the most recent stored metrics of a symbol."""
+        entry = await self._latest_entry()
+        if entry is None:
+            return None
+        if symbol in entry[1]:
+            return entry[1].get(symbol)
+        # Stocks whose last fetch failed are only in older snapshots
+        return (await self._history()).get_latest(symbol)
+    
+    async def _history(self) -> FundamentalsHistory:
+        stacked = self._current_history()
+        if stacked is None:
+            stacked = await asyncio.to_thread(self._stack)
+        return stacked
+    
+    async def history(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[date, Dict[str, Optional[float]]]]:
+        """Return the stored metrics of a symbol per day, oldest first."""
+        return (await self._history()).get(symbol, start, end)
+    
+    async def version(self) -> Optional[Tuple[date, float]]:
+        """Identify the latest snapshot, so results derived from it can be cached."""
+        entry = await self._latest_entry()
+        return None if entry is None else (entry[1].day, entry[0])
+
+fundamentals_store = FundamentalsStore(os.getenv("FUNDAMENTALS_DIR", os.path.join("data", "fundamentals")))
@@ -0,0 +1,43 @@
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Dict, List
+
+_lock = threading.Lock()
+_proxies: Dict[str, "LazyModule"] = {}
+
+class LazyModule(ModuleType):
+    """Stand-in for a module that is only actually imported on first attribute access."""
+    
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+    
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            # Import under a lock so no thread sees a partially initialised module
+            with _lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+        return self._module
+    
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module that is only actually imported on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    
+    with _lock:
+        if name not in _proxies:
+            _proxies[name] = LazyModule(name)
+        return _proxies[name]
+
+def load_modules(names: List[str]) -> None:
+    """Finish importing lazily imported modules, e.g. from a background thread."""
+    for name in names:
+        module = lazy_import(name)
+        if isinstance(module, LazyModule):
+            module._load()
@@ -0,0 +1,70 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+# Tadawul trades Sunday to Thursday, 10:00 - 15:00 Riyadh time
+MARKET_TIMEZONE = ZoneInfo("Asia/Riyadh")
+TRADING_WEEKDAYS = {6, 0, 1, 2, 3}  # Python weekday numbers for Sunday - Thursday
+SESSION_OPEN = time(10, 0)
+SESSION_CLOSE = time(15, 0)
+
+# Wait for the closing auction and end-of-day data before refreshing
+REFRESH_DELAY = timedelta(minutes=20)
+
+# Intraday bars keep changing while the market is open
+INTRADAY_TTL = timedelta(minutes=15)
+
+# Never keep data longer than this, even if the holiday list is out of date
+MAX_TTL = timedelta(days=1)
+
+# Market holidays as announced by Tadawul. Eid dates follow the lunar calendar,
+# so future years are estimates and should be confirmed against the announcements.
+MARKET_HOLIDAYS = {
+    date(2025, 2, 23),  # Founding Day
+    *(date(2025, 3, 30) + timedelta(days=i) for i in range(4)),  # Eid al-Fitr
+    *(date(2025, 6, 5) + timedelta(days=i) for i in range(5)),  # Eid al-Adha
+    date(2025, 9, 23),  # National Day
+    date(2026, 2, 22),  # Founding Day
+    *(date(2026, 3, 19) + timedelta(days=i) for i in range(5)),  # Eid al-Fitr
+    *(date(2026, 5, 26) + timedelta(days=i) for i in range(5)),  # Eid al-Adha
+    date(2026, 9, 23),  # National Day
+}
+
+class MarketCalendar:
+    @staticmethod
+    def now() -> datetime:
+        """Return the current time in the market's timezone."""
+        return datetime.now(MARKET_TIMEZONE)
+    
+    @staticmethod
+    def is_trading_day(day: date) -> bool:
+        """Check whether the market holds a session on the given day."""
+        return day.weekday() in TRADING_WEEKDAYS and day not in MARKET_HOLIDAYS
+    
+    @staticmethod
+    def is_session_open(now: Optional[datetime] = None) -> bool:
+        """Check whether the market is currently in its trading session."""
+        now = (now or MarketCalendar.now()).astimezone(MARKET_TIMEZONE)
+        return MarketCalendar.is_trading_day(now.date()) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+    
+    @staticmethod
+    def next_refresh_time(now: Optional[datetime] = None) -> datetime:
+        """Return the time after the next session close at which market data should be refreshed."""
+        now = (now or MarketCalendar.now()).astimezone(MARKET_TIMEZONE)
+        day = now.date()
+        
+        while True:
+            if MarketCalendar.is_trading_day(day):
+                refresh_time = datetime.combine(day, SESSION_CLOSE, MARKET_TIMEZONE) + REFRESH_DELAY
+                if refresh_time > now:
+                    return refresh_time
+            day += timedelta(days=1)
+    
+    @staticmethod
+    def data_expiry(now: Optional[datetime] = None) -> datetime:
+        """Return until when market data fetched now can be served from cache."""
+        now = (now or MarketCalendar.now()).astimezone(MARKET_TIMEZONE)
+        
+        if MarketCalendar.is_session_open(now):
+            return now + INTRADAY_TTL
+        return min(MarketCalendar.next_refresh_time(now), now + MAX_TTL)
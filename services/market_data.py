@@ -0,0 +1,358 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from services.deadline import remaining_time
+from services.executor import run_upstream
+from services.metrics import registry
+from services.market_calendar import MARKET_TIMEZONE
+from services.lazy import lazy_import
+
+pd = lazy_import("pandas")
+yf = lazy_import("yfinance")
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_OPEN = registry.gauge(
+    "mefic_upstream_circuit_open", "Whether the circuit breaker of a provider is open.", ["provider"]
+)
+
+class UpstreamUnavailableError(Exception):
+    """Raised when a market data provider cannot serve a request right now."""
+    
+    def __init__(self, message: str, retry_after: float = 30.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class MarketDataProvider:
+    """Interface of a market data source. All methods are blocking."""
+    
+    name = "base"
+    
+    def history(self, symbol: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        """Daily OHLCV bars of a symbol, indexed by exchange-localized dates."""
+        raise NotImplementedError
+    
+    def download(self, symbols: List[str], start: datetime) -> Dict[str, pd.DataFrame]:
+        """Daily OHLCV bars of many symbols, keyed by symbol. Symbols without data are left out."""
+        return {symbol: self.history(symbol, start) for symbol in symbols}
+    
+    def info(self, symbol: str) -> Dict:
+        """Company information in the yfinance `info` format (trailingPE, returnOnEquity, ...)."""
+        raise NotImplementedError
+    
+    def quote(self, symbol: str) -> Dict:
+        """Latest price and previous close of a symbol."""
+        raise NotImplementedError
+
+class YahooFinanceProvider(MarketDataProvider):
+    """Market data from Yahoo Finance through yfinance."""
+    
+    name = "yfinance"
+    
+    def history(self, symbol: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        return yf.Ticker(symbol).history(start=start, end=end)
+    
+    def download(self, symbols: List[str], start: datetime) -> Dict[str, pd.DataFrame]:
+        data = yf.download(symbols, start=start, group_by='ticker', auto_adjust=True, progress=False)
+        
+        result = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                df = data[symbol]
+            else:
+                df = data
+            
+            df = df.dropna(how='all')
+            if df.empty:
+                continue
+            
+            # Downloads are not localized, unlike Ticker.history
+            if df.index.tz is None:
+                df = df.tz_localize(MARKET_TIMEZONE)
+            result[symbol] = df
+        return result
+    
+    def info(self, symbol: str) -> Dict:
+        return yf.Ticker(symbol).info
+    
+    def quote(self, symbol: str) -> Dict:
+        fast_info = yf.Ticker(symbol).fast_info
+        return {
+            "price": fast_info["lastPrice"],
+            "previous_close": fast_info["previousClose"]
+        }
+
+class FileProvider(MarketDataProvider):
+    """
+    Market data from local files, for offline use and as a stand-in during outages.
+    
+    Layout under the root directory:
+        prices/<symbol>.csv   Date,Open,High,Low,Close,Volume
+        info/<symbol>.json    yfinance-style info dictionary
+    """
+    
+    name = "file"
+    
+    def __init__(self, root: str):
+        self.root = Path(root)
+    
+    def history(self, symbol: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        path = self.root / "prices" / f"{symbol}.csv"
+        if not path.exists():
+            return pd.DataFrame()
+        
+        df = pd.read_csv(path, index_col="Date", parse_dates=True)
+        if df.index.tz is None:
+            df = df.tz_localize(MARKET_TIMEZONE)
+        
+        start = pd.Timestamp(start)
+        df = df[df.index >= (start.tz_localize(MARKET_TIMEZONE) if start.tzinfo is None else start)]
+        if end is not None:
+            end = pd.Timestamp(end)
+            df = df[df.index < (end.tz_localize(MARKET_TIMEZONE) if end.tzinfo is None else end)]
+        return df
+    
+    def download(self, symbols: List[str], start: datetime) -> Dict[str, pd.DataFrame]:
+        result = {}
+        for symbol in symbols:
+            df = self.history(symbol, start)
+            if not df.empty:
+                result[symbol] = df
+        return result
+    
+    def info(self, symbol: str) -> Dict:
+        path = self.root / "info" / f"{symbol}.json"
+        if not path.exists():
+            return {}
+        with open(path) as f:
+            return json.load(f)
+    
+    def quote(self, symbol: str) -> Dict:
+        path = self.root / "prices" / f"{symbol}.csv"
+        if not path.exists():
+            return {"price": None, "previous_close": None}
+        
+        close = pd.read_csv(path, usecols=["Close"])["Close"]
+        return {
+            "price": float(close.iloc[-1]) if len(close) else None,
+            "previous_close": float(close.iloc[-2]) if len(close) > 1 else None
+        }
+
+class CircuitBreaker:
+    """Stops calling a provider after repeated failures, then lets a single probe through."""
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+    
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe through."""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+    
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+    
+    def release(self) -> None:
+        """Give back a half-open probe that ended without an outcome."""
+        self._probing = False
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+class TokenBucket:
+    """Rate limiter allowing `rate` calls per second with bursts of up to `capacity` calls."""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now > self.paused_until:
+            self.tokens = min(self.capacity, self.tokens + (now - max(self.updated_at, self.paused_until)) * self.rate)
+        self.updated_at = now
+    
+    def wait_time(self) -> float:
+        """Seconds until a token is available."""
+        self._refill()
+        pause = max(self.paused_until - time.monotonic(), 0.0)
+        if self.tokens >= 1:
+            return pause
+        return pause + (1 - self.tokens) / self.rate
+    
+    async def acquire(self, max_wait: float) -> bool:
+        """Take a token, waiting up to max_wait seconds. Returns False if that is not enough."""
+        while True:
+            wait = self.wait_time()
+            if wait <= 0:
+                self.tokens -= 1
+                return True
+            if wait > max_wait:
+                return False
+            await asyncio.sleep(wait)
+            max_wait -= wait
+    
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for a while, e.g. after the provider throttled us."""
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Check whether an upstream error means we are being throttled."""
+    return "ratelimit" in type(error).__name__.lower() or "too many requests" in str(error).lower()
+
+class ResilientProvider:
+    """
+    Wraps a provider with rate limiting, bounded retries and a circuit breaker.
+    
+    Calls fail fast with UpstreamUnavailableError instead of waiting out timeouts
+    while the provider is throttling or failing, so callers can serve cached data.
+    """
+    
+    def __init__(
+        self,
+        provider: MarketDataProvider,
+        rate: float = 5.0,
+        burst: float = 10.0,
+        max_wait: float = 2.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        throttle_cooldown: float = 60.0
+    ):
+        self.provider = provider
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.throttle_cooldown = throttle_cooldown
+    
+    @property
+    def name(self) -> str:
+        return self.provider.name
+    
+    async def _call(self, operation: str, *args):
+        for attempt in range(self.retries + 1):
+            if self.breaker.state == "open":
+                raise UpstreamUnavailableError(
+                    f"{self.name} is unavailable", retry_after=self.breaker.retry_after()
+                )
+            
+            # Never wait past the deadline of the request being served
+            budget = remaining_time()
+            if budget is not None and budget <= 0:
+                raise UpstreamUnavailableError(f"{self.name} {operation} exceeded the request deadline", retry_after=1)
+            
+            if not await self.bucket.acquire(self.max_wait if budget is None else min(self.max_wait, budget)):
+                raise UpstreamUnavailableError(
+                    f"{self.name} rate limit reached", retry_after=self.bucket.wait_time()
+                )
+            
+            # Only claim the half-open probe once nothing but the call itself stands in the way
+            if not self.breaker.allow():
+                raise UpstreamUnavailableError(
+                    f"{self.name} is unavailable", retry_after=self.breaker.retry_after()
+                )
+            
+            try:
+                result = await asyncio.wait_for(
+                    run_upstream(self.name, operation, getattr(self.provider, operation), *args),
+                    timeout=remaining_time()
+                )
+                self.breaker.record_success()
+                CIRCUIT_OPEN.set(0, provider=self.name)
+                return result
+            except Exception as e:
+                budget = remaining_time()
+                if isinstance(e, asyncio.TimeoutError) and budget is not None and budget <= 0:
+                    # The call may still finish in the background, but nobody is waiting for it
+                    self.breaker.release()
+                    raise UpstreamUnavailableError(f"{self.name} {operation} exceeded the request deadline", retry_after=1)
+                
+                self.breaker.record_failure()
+                CIRCUIT_OPEN.set(1 if self.breaker.opened_at is not None else 0, provider=self.name)
+                if _is_rate_limited(e):
+                    # Back off for everyone, not just this request
+                    self.bucket.pause(self.throttle_cooldown)
+                    raise UpstreamUnavailableError(
+                        f"{self.name} is throttling requests", retry_after=self.throttle_cooldown
+                    )
+                
+                delay = self.backoff * (2 ** attempt)
+                if attempt == self.retries or (budget is not None and budget < delay):
+                    raise UpstreamUnavailableError(f"{self.name} {operation} failed: {str(e)}")
+                
+                logger.warning("%s %s failed (attempt %d): %s", self.name, operation, attempt + 1, e)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+            except BaseException:
+                # Cancelled mid-call, so there is no outcome to record
+                self.breaker.release()
+                raise
+    
+    async def history(self, symbol: str, start: datetime, end: Optional[datetime] = None) -> pd.DataFrame:
+        return await self._call("history", symbol, start, end)
+    
+    async def download(self, symbols: List[str], start: datetime) -> Dict[str, pd.DataFrame]:
+        return await self._call("download", symbols, start)
+    
+    async def info(self, symbol: str) -> Dict:
+        return await self._call("info", symbol)
+    
+    async def quote(self, symbol: str) -> Dict:
+        return await self._call("quote", symbol)
+
+def create_provider() -> MarketDataProvider:
+    """Create the provider selected by the MARKET_DATA_PROVIDER environment variable."""
+    name = os.getenv("MARKET_DATA_PROVIDER", "yfinance")
+    if name == "yfinance":
+        return YahooFinanceProvider()
+    if name == "file":
+        return FileProvider(os.getenv("MARKET_DATA_DIR", "market_data"))
+    raise ValueError(f"Unknown market data provider: {name}")
+
+market_data = ResilientProvider(
+    create_provider(),
+    rate=float(os.getenv("MARKET_DATA_RATE", "5")),
+    burst=float(os.getenv("MARKET_DATA_BURST", "10"))
+)
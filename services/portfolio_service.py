@@ -1,53 +1,133 @@
-import pandas as pd
-import numpy as np
-import yfinance as yf
-from typing import Dict
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, List
+from services.cache import LRUCache
+from services.stock_service import StockService
+from services.market_data import UpstreamUnavailableError
+from services.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+portfolio_cache = LRUCache("portfolio")
 
 class PortfolioService:
+    @staticmethod
+    def compute_portfolio_metrics(returns: pd.Series, market_returns: pd.Series) -> Dict[str, float]:
+        """Calculate portfolio metrics from daily stock returns and market returns."""
+        # Calculate annualized return
+        annual_return = (1 + returns.mean()) ** 252 - 1
+        
+        # Match the dates
+        stock_returns_aligned, market_returns_aligned = StockService.align_returns(returns, market_returns)
+        
+        # Calculate beta
+        covariance = stock_returns_aligned.cov(market_returns_aligned)
+        market_variance = market_returns_aligned.var()
+        beta = covariance / market_variance
+        
+        # Calculate Alpha
+        risk_free_rate = 0.02 / 252  # Daily risk-free rate
+        stock_annual_return = (1 + stock_returns_aligned.mean()) ** 252 - 1
+        market_annual_return = (1 + market_returns_aligned.mean()) ** 252 - 1
+        alpha = stock_annual_return - (risk_free_rate + beta * (market_annual_return - risk_free_rate))
+        
+        # Calculate Tracking Error
+        tracking_diff = stock_returns_aligned - market_returns_aligned
+        tracking_error = tracking_diff.std() * np.sqrt(252)
+        
+        # Calculate Information Ratio
+        information_ratio = (stock_annual_return - market_annual_return) / tracking_error
+        
+        return {
+            "annual_return": annual_return,
+            "alpha": alpha,
+            "info_ratio": information_ratio,
+            "tracking_error": tracking_error
+        }
+    
+    @staticmethod
+    def compute_portfolio_metrics_matrix(returns: pd.DataFrame, market_returns: pd.Series) -> pd.DataFrame:
+        """
+        Calculate portfolio metrics column-wise for a dates x symbols matrix of daily returns.
+        
+        Args:
+            returns: Daily returns with one column per symbol, NaN where a stock did not trade
+            market_returns: Daily market returns on the benchmark's own trading dates
+        
+        Returns:
+            DataFrame indexed by symbol with annual_return, alpha, info_ratio and tracking_error
+        """
+        # Calculate annualized return
+        annual_return = (1 + returns.mean()) ** 252 - 1
+        
+        # Only pair each stock with the market on their common dates
+        stock_aligned, market_aligned = StockService.pair_with_market(returns, market_returns)
+        stock_mean = stock_aligned.mean()
+        market_mean = market_aligned.mean()
+        
+        # Calculate beta
+        observations = stock_aligned.count()
+        covariance = ((stock_aligned - stock_mean) * (market_aligned - market_mean)).sum() / (observations - 1)
+        beta = covariance / market_aligned.var()
+        
+        # Calculate Alpha
+        risk_free_rate = 0.02 / 252  # Daily risk-free rate
+        stock_annual_return = (1 + stock_mean) ** 252 - 1
+        market_annual_return = (1 + market_mean) ** 252 - 1
+        alpha = stock_annual_return - (risk_free_rate + beta * (market_annual_return - risk_free_rate))
+        
+        # Calculate Tracking Error
+        tracking_error = (stock_aligned - market_aligned).std() * np.sqrt(252)
+        
+        # Calculate Information Ratio
+        information_ratio = (stock_annual_return - market_annual_return) / tracking_error
+        
+        return pd.DataFrame({
+            "annual_return": annual_return,
+            "alpha": alpha,
+            "info_ratio": information_ratio,
+            "tracking_error": tracking_error
+        })
+    
     @staticmethod
     async def calculate_portfolio_metrics(df: pd.DataFrame) -> Dict[str, float]:
         """Calculate portfolio metrics for a given DataFrame of stock prices."""
         try:
             # Calculate daily returns
-            returns = df['Close'].pct_change().dropna()
-            
-            # Calculate annualized return
-            annual_return = (1 + returns.mean()) ** 252 - 1
+            returns = StockService.get_daily_returns(df['Close'])
             
             # Get market data (Saudi index)
-            market = yf.download('^TASI', 
-                                start=df.index[0], 
-                                end=df.index[-1])
-            market_returns = market['Close'].pct_change().dropna()
-            
-            # Match the dates
-            common_dates = returns.index.intersection(market_returns.index)
-            stock_returns_aligned = returns.loc[common_dates]
-            market_returns_aligned = market_returns.loc[common_dates]
+            market = await StockService.get_benchmark_data(df.index[0], df.index[-1] + pd.Timedelta(days=1))
+            market_returns = StockService.get_daily_returns(market)
             
-            # Calculate beta
-            covariance = stock_returns_aligned.cov(market_returns_aligned)
-            market_variance = market_returns_aligned.var()
-            beta = covariance / market_variance
-            
-            # Calculate Alpha
-            risk_free_rate = 0.02 / 252  # Daily risk-free rate
-            stock_annual_return = (1 + stock_returns_aligned.mean()) ** 252 - 1
-            market_annual_return = (1 + market_returns_aligned.mean()) ** 252 - 1
-            alpha = stock_annual_return - (risk_free_rate + beta * (market_annual_return - risk_free_rate))
-            
-            # Calculate Tracking Error
-            tracking_diff = stock_returns_aligned - market_returns_aligned
-            tracking_error = tracking_diff.std() * np.sqrt(252)
-            
-            # Calculate Information Ratio
-            information_ratio = (stock_annual_return - market_annual_return) / tracking_error
-            
-            return {
-                "annual_return": annual_return,
-                "alpha": alpha,
-                "info_ratio": information_ratio,
-                "tracking_error": tracking_error
-            }
+            return PortfolioService.compute_portfolio_metrics(returns, market_returns)
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
-            raise ValueError(f"Error calculating portfolio metrics: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error calculating portfolio metrics: {str(e)}")
+    
+    @staticmethod
+    async def get_portfolio_metrics(symbol: str, period: str, refresh: bool = False) -> Dict[str, float]:
+        """Get portfolio metrics for a stock over a period, served from cache while the data is unchanged."""
+        version = (await StockService.get_data_version(symbol, period), await StockService.get_benchmark_version())
+        cached = None if refresh else portfolio_cache.get(version)
+        if cached is not None:
+            return dict(cached)
+        
+        # Get stock data
+        start_date, end_date = StockService.get_date_range(period)
+        df = await StockService.get_stock_data(symbol, start_date, end_date)
+        
+        # Calculate portfolio metrics
+        metrics = await PortfolioService.calculate_portfolio_metrics(df)
+        
+        portfolio_cache.set(version, metrics)
+        return dict(metrics)
+    
+    @staticmethod
+    async def calculate_batch_portfolio_metrics(symbols: List[str], start_date: datetime, end_date: datetime) -> List[Dict[str, float]]:
+        """Calculate portfolio metrics for many stocks over one returns matrix."""
+        return await StockService.calculate_batch_metrics(
+            symbols, start_date, end_date, PortfolioService.compute_portfolio_metrics_matrix, "portfolio metrics"
+        )
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from typing import Dict, List, Set
+from services.market_calendar import MarketCalendar
+from services.stock_service import StockService
+from services.metrics import registry
+from models import Quote
+
+QUOTES_DROPPED = registry.counter(
+    "mefic_quotes_dropped_total", "Quotes dropped for slow streaming clients."
+)
+
+logger = logging.getLogger(__name__)
+
+class QuoteHub:
+    """
+    Fans out live quotes to streaming clients.
+    
+    Each subscribed symbol is polled upstream once per interval, no matter how many
+    clients watch it. Every connection gets its own bounded queue; when a client falls
+    behind, its oldest pending quotes are dropped rather than slowing everyone down.
+    """
+    
+    def __init__(self, interval: float = 5.0, closed_interval: float = 60.0, queue_size: int = 32):
+        self.interval = interval
+        self.closed_interval = closed_interval
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._latest: Dict[str, Quote] = {}
+    
+    def subscribe(self, symbols: List[str]) -> asyncio.Queue:
+        """Register a new connection for the given symbols and return its quote queue."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        
+        for symbol in symbols:
+            self._subscribers.setdefault(symbol, set()).add(queue)
+            
+            # Start polling on the first subscriber
+            if symbol not in self._pollers:
+                self._pollers[symbol] = asyncio.create_task(self._poll(symbol))
+            
+            # Send the last known quote right away
+            if symbol in self._latest:
+                self._offer(queue, self._latest[symbol])
+        
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue, symbols: List[str]) -> None:
+        """Remove a connection and stop polling symbols nobody watches anymore."""
+        for symbol in symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[symbol]
+                poller = self._pollers.pop(symbol, None)
+                if poller is not None:
+                    poller.cancel()
+                self._latest.pop(symbol, None)
+    
+    def subscriber_count(self, symbol: str) -> int:
+        """Return the number of connections watching a symbol."""
+        return len(self._subscribers.get(symbol, ()))
+    
+    def _offer(self, queue: asyncio.Queue, quote: Quote) -> None:
+        """Queue a quote for one connection, dropping its oldest quote if it is full."""
+        if queue.full():
+            queue.get_nowait()
+            QUOTES_DROPPED.inc()
+        queue.put_nowait(quote)
+    
+    def _publish(self, quote: Quote) -> None:
+        """Send a quote to every connection watching its symbol."""
+        self._latest[quote.symbol] = quote
+        for queue in list(self._subscribers.get(quote.symbol, ())):
+            self._offer(queue, quote)
+    
+    async def _poll(self, symbol: str) -> None:
+        """Poll upstream for a symbol while it has subscribers."""
+        while True:
+            try:
+                quote = Quote(**await StockService.get_quote(symbol))
+                
+                # Only push when something changed
+                previous = self._latest.get(symbol)
+                if previous is None or (previous.price, previous.previous_close) != (quote.price, quote.previous_close):
+                    self._publish(quote)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Quote polling for %s failed: %s", symbol, e)
+            
+            # Quotes barely move outside the session
+            await asyncio.sleep(self.interval if MarketCalendar.is_session_open() else self.closed_interval)
+    
+    async def stop(self) -> None:
+        """Stop all pollers."""
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+        self._subscribers.clear()
+        self._latest.clear()
+
+quote_hub = QuoteHub()
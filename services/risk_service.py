@@ -1,59 +1,261 @@
-import pandas as pd
-import numpy as np
-import yfinance as yf
-from typing import Dict
+from __future__ import annotations
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from services.cache import LRUCache
+from services.stock_service import StockService
+from services.market_data import UpstreamUnavailableError
+from services.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+risk_cache = LRUCache("risk")
 
 class RiskService:
+    @staticmethod
+    def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+        """Sum every trailing window in O(n) using a cumulative sum, NaN until the first window is full."""
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        result = np.full(len(values), np.nan)
+        result[window - 1:] = cumulative[window:] - cumulative[:-window]
+        return result
+    
+    @staticmethod
+    def _flat_windows(values: np.ndarray, window: int) -> np.ndarray:
+        """
+        Mark the trailing windows in which every value is the same, e.g. over a trading halt.
+        
+        Running sums leave rounding noise instead of an exact zero variance there, so
+        flat windows are found from the number of changes between consecutive values.
+        """
+        changes = np.concatenate(([0.0], (values[1:] != values[:-1]).astype(float)))
+        flat = RiskService._rolling_sum(changes, window - 1) == 0
+        flat[:window - 1] = False
+        return flat
+    
+    @staticmethod
+    def compute_risk_metrics(returns: pd.Series, market_returns: Optional[pd.Series] = None) -> Dict[str, float]:
+        """Calculate risk metrics from daily stock returns and, if available, market returns."""
+        # Calculate volatility (annualized)
+        volatility = returns.std() * np.sqrt(252)
+        
+        if market_returns is not None and not market_returns.empty:
+            # Match the dates
+            stock_returns_aligned, market_returns_aligned = StockService.align_returns(returns, market_returns)
+            
+            # Calculate beta
+            covariance = stock_returns_aligned.cov(market_returns_aligned)
+            market_variance = market_returns_aligned.var()
+            beta = covariance / market_variance
+        else:
+            # Fallback if market data is unavailable
+            beta = 1.0  # Neutral beta as fallback
+        
+        # Calculate Sharpe Ratio (assuming risk-free rate of 0.02 or 2%)
+        risk_free_rate = 0.02 / 252  # Daily risk-free rate
+        sharpe_ratio = (returns.mean() - risk_free_rate) / returns.std() * np.sqrt(252)
+        
+        # Calculate Max Drawdown
+        cumulative_returns = (1 + returns).cumprod()
+        max_return = cumulative_returns.cummax()
+        drawdown = (cumulative_returns / max_return) - 1
+        max_drawdown = drawdown.min()
+        
+        return {
+            "beta": beta,
+            "volatility": volatility,
+            "sharpe_ratio": sharpe_ratio,
+            "max_drawdown": max_drawdown
+        }
+    
+    @staticmethod
+    def compute_risk_metrics_matrix(returns: pd.DataFrame, market_returns: pd.Series) -> pd.DataFrame:
+        """
+        Calculate risk metrics column-wise for a dates x symbols matrix of daily returns.
+        
+        Args:
+            returns: Daily returns with one column per symbol, NaN where a stock did not trade
+            market_returns: Daily market returns on the benchmark's own trading dates
+        
+        Returns:
+            DataFrame indexed by symbol with beta, volatility, sharpe_ratio and max_drawdown
+        """
+        # Calculate volatility (annualized)
+        std = returns.std()
+        volatility = std * np.sqrt(252)
+        
+        # Calculate beta, only pairing each stock with the market on their common dates
+        stock_aligned, market_aligned = StockService.pair_with_market(returns, market_returns)
+        observations = stock_aligned.count()
+        covariance = ((stock_aligned - stock_aligned.mean()) * (market_aligned - market_aligned.mean())).sum() / (observations - 1)
+        beta = covariance / market_aligned.var()
+        
+        # Calculate Sharpe Ratio (assuming risk-free rate of 0.02 or 2%)
+        risk_free_rate = 0.02 / 252  # Daily risk-free rate
+        sharpe_ratio = (returns.mean() - risk_free_rate) / std * np.sqrt(252)
+        
+        # Calculate Max Drawdown (days without a trade leave the value unchanged)
+        cumulative_returns = (1 + returns.fillna(0)).cumprod()
+        drawdown = (cumulative_returns / cumulative_returns.cummax()) - 1
+        max_drawdown = drawdown.min()
+        
+        return pd.DataFrame({
+            "beta": beta,
+            "volatility": volatility,
+            "sharpe_ratio": sharpe_ratio,
+            "max_drawdown": max_drawdown
+        })
+    
+    @staticmethod
+    def compute_rolling_risk_metrics(returns: pd.Series, market_returns: Optional[pd.Series], windows: List[int]) -> Dict:
+        """
+        Calculate rolling risk time series from daily returns.
+        
+        Every window is evaluated with cumulative-sum kernels, so the cost is O(n) per
+        window size instead of re-running the point calculation for each window.
+        
+        Returns:
+            Dictionary with the dates, the drawdown curve and, per window size, rolling
+            beta, annualized volatility and Sharpe ratio (NaN until the window is full,
+            and NaN for ratios over windows without any variance)
+        """
+        dates = pd.DatetimeIndex(returns.index).tz_localize(None).normalize()
+        r = returns.to_numpy(dtype=float)
+        
+        # Center the returns so the running sums stay numerically stable
+        r_mean = r.mean()
+        r_centered = r - r_mean
+        
+        # Beta pairs stock and market returns on their common dates
+        if market_returns is not None and not market_returns.empty:
+            stock_aligned, market_aligned = StockService.align_returns(returns, market_returns)
+            a = stock_aligned.to_numpy(dtype=float)
+            m = market_aligned.to_numpy(dtype=float)
+            a = a - a.mean()
+            m = m - m.mean()
+        else:
+            stock_aligned = None
+        
+        risk_free_rate = 0.02 / 252  # Daily risk-free rate
+        results = []
+        for window in windows:
+            # Rolling volatility (annualized)
+            sum_r = RiskService._rolling_sum(r_centered, window)
+            sum_rr = RiskService._rolling_sum(r_centered * r_centered, window)
+            variance = np.maximum(sum_rr - sum_r * sum_r / window, 0) / (window - 1)
+            flat = RiskService._flat_windows(r, window)
+            variance[flat] = 0.0
+            std = np.sqrt(variance)
+            volatility = std * np.sqrt(252)
+            
+            # Rolling Sharpe Ratio, undefined where the returns did not vary
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sharpe_ratio = (sum_r / window + r_mean - risk_free_rate) / std * np.sqrt(252)
+            sharpe_ratio[flat] = np.nan
+            
+            # Rolling beta against the market
+            if stock_aligned is not None and len(a) >= window:
+                sum_a = RiskService._rolling_sum(a, window)
+                sum_m = RiskService._rolling_sum(m, window)
+                covariance = RiskService._rolling_sum(a * m, window) - sum_a * sum_m / window
+                market_variance = RiskService._rolling_sum(m * m, window) - sum_m * sum_m / window
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    beta = covariance / market_variance
+                # Undefined where the market did not move
+                beta[RiskService._flat_windows(m, window)] = np.nan
+                beta = pd.Series(beta, index=stock_aligned.index).reindex(dates).to_numpy()
+            else:
+                beta = np.full(len(r), np.nan)
+            
+            results.append({
+                "window": window,
+                "beta": beta,
+                "volatility": volatility,
+                "sharpe_ratio": sharpe_ratio
+            })
+        
+        # Underwater curve
+        cumulative_returns = np.cumprod(1 + r)
+        drawdown = cumulative_returns / np.maximum.accumulate(cumulative_returns) - 1
+        
+        return {
+            "dates": dates,
+            "drawdown": drawdown,
+            "windows": results
+        }
+    
     @staticmethod
     async def calculate_risk_metrics(df: pd.DataFrame) -> Dict[str, float]:
         """Calculate risk metrics for a given DataFrame of stock prices."""
         try:
             # Calculate daily returns
-            returns = df['Close'].pct_change().dropna()
-            
-            # Calculate volatility (annualized)
-            volatility = returns.std() * np.sqrt(252)
+            returns = StockService.get_daily_returns(df['Close'])
             
             try:
                 # Try to get the market returns (TASI - Saudi index)
-                market = yf.download('^TASI', 
-                                    start=df.index[0], 
-                                    end=df.index[-1])
-                
-                if not market.empty:
-                    market_returns = market['Close'].pct_change().dropna()
-                    
-                    # Match the dates
-                    common_dates = returns.index.intersection(market_returns.index)
-                    stock_returns_aligned = returns.loc[common_dates]
-                    market_returns_aligned = market_returns.loc[common_dates]
-                    
-                    # Calculate beta
-                    covariance = stock_returns_aligned.cov(market_returns_aligned)
-                    market_variance = market_returns_aligned.var()
-                    beta = covariance / market_variance
-                else:
-                    # Fallback if market data is empty
-                    beta = 1.0  # Neutral beta as fallback
-            except Exception:
-                # Fallback if market data fails to download
-                beta = 1.0  # Neutral beta as fallback
-            
-            # Calculate Sharpe Ratio (assuming risk-free rate of 0.02 or 2%)
-            risk_free_rate = 0.02 / 252  # Daily risk-free rate
-            sharpe_ratio = (returns.mean() - risk_free_rate) / returns.std() * np.sqrt(252)
-            
-            # Calculate Max Drawdown
-            cumulative_returns = (1 + returns).cumprod()
-            max_return = cumulative_returns.cummax()
-            drawdown = (cumulative_returns / max_return) - 1
-            max_drawdown = drawdown.min()
-            
-            return {
-                "beta": beta,
-                "volatility": volatility,
-                "sharpe_ratio": sharpe_ratio,
-                "max_drawdown": max_drawdown
-            }
+                market = await StockService.get_benchmark_data(df.index[0], df.index[-1] + pd.Timedelta(days=1))
+                market_returns = StockService.get_daily_returns(market)
+            except ValueError as e:
+                # Fallback if there is no market data for the period
+                logger.warning("Calculating risk metrics without market data: %s", e)
+                market_returns = None
+            
+            return RiskService.compute_risk_metrics(returns, market_returns)
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error calculating risk metrics: {str(e)}")
+    
+    @staticmethod
+    async def get_risk_metrics(symbol: str, period: str, refresh: bool = False) -> Dict[str, float]:
+        """Get risk metrics for a stock over a period, served from cache while the data is unchanged."""
+        version = (await StockService.get_data_version(symbol, period), await StockService.get_benchmark_version())
+        cached = None if refresh else risk_cache.get(version)
+        if cached is not None:
+            return dict(cached)
+        
+        # Get stock data
+        start_date, end_date = StockService.get_date_range(period)
+        df = await StockService.get_stock_data(symbol, start_date, end_date)
+        
+        # Calculate risk metrics
+        metrics = await RiskService.calculate_risk_metrics(df)
+        
+        risk_cache.set(version, metrics)
+        return dict(metrics)
+    
+    @staticmethod
+    async def calculate_batch_risk_metrics(symbols: List[str], start_date: datetime, end_date: datetime) -> List[Dict[str, float]]:
+        """Calculate risk metrics for many stocks over one returns matrix."""
+        return await StockService.calculate_batch_metrics(
+            symbols, start_date, end_date, RiskService.compute_risk_metrics_matrix, "risk metrics"
+        )
+    
+    @staticmethod
+    async def calculate_rolling_risk_metrics(df: pd.DataFrame, windows: List[int]) -> Dict:
+        """Calculate rolling risk time series for a given DataFrame of stock prices."""
+        try:
+            # Calculate daily returns
+            returns = StockService.get_daily_returns(df['Close'])
+            
+            for window in windows:
+                if window < 2 or window > len(returns):
+                    raise ValueError(f"Window must be between 2 and {len(returns)} days, got {window}")
+            
+            try:
+                # Include the last bar so the latest beta is available
+                market = await StockService.get_benchmark_data(df.index[0], df.index[-1] + pd.Timedelta(days=1))
+                market_returns = StockService.get_daily_returns(market)
+            except ValueError as e:
+                # Without market data there is no rolling beta
+                logger.warning("Calculating rolling risk metrics without market data: %s", e)
+                market_returns = None
+            
+            return RiskService.compute_rolling_risk_metrics(returns, market_returns, windows)
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
-            raise ValueError(f"Error calculating risk metrics: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error calculating rolling risk metrics: {str(e)}")
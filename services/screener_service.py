@@ -1,19 +1,155 @@
-from typing import Dict, List
+from __future__ import annotations
+import base64
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
 from services.financial_service import FinancialService
+from services.fundamentals_store import fundamentals_store
 from services.stock_service import StockService
+from services.cache import LRUCache, TTLCache
+from services.market_calendar import MarketCalendar
+from services.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+screener_cache = TTLCache("screener", maxsize=128)
+screener_query_cache = LRUCache("screener_queries", maxsize=1024)
+
+# Metrics that can be filtered by range and sorted on
+SCREENER_METRICS = ("pe_ratio", "roe", "roa", "dividend_yield", "payout_ratio", "dividend_score", "weighted_score")
+SORT_FIELDS = SCREENER_METRICS + ("symbol",)
+DEFAULT_SORT = ("-weighted_score",)
+
+class ScreenerIndex:
+    """
+    Screener rows of one fundamentals snapshot and weighting, indexed for queries.
+    
+    Each metric is kept as a column together with its rows in ascending order and
+    dense ascending and descending ranks, and each sector has a boolean mask. A
+    range filter is then two binary searches, and sorting a selection only compares
+    precomputed integer ranks.
+    """
+    
+    def __init__(self, rows: List[Dict], version: str):
+        self.rows = rows
+        self.version = version
+        n = len(rows)
+        
+        self.columns = {
+            metric: np.array([np.nan if row.get(metric) is None else row[metric] for row in rows], dtype=np.float64)
+            for metric in SCREENER_METRICS
+        }
+        
+        # Rows of each metric in ascending order, without missing values
+        self.sorted_rows = {}
+        self.sorted_values = {}
+        for metric, values in self.columns.items():
+            order = np.argsort(values, kind="stable")
+            order = order[~np.isnan(values[order])]
+            self.sorted_rows[metric] = order
+            self.sorted_values[metric] = values[order]
+        
+        self.ranks = {}
+        for metric, values in self.columns.items():
+            self.ranks[metric], self.ranks[f"-{metric}"] = self._dense_ranks(values)
+        _, symbol_ranks = np.unique(np.array([row["symbol"] for row in rows], dtype=str), return_inverse=True)
+        self.ranks["symbol"] = symbol_ranks.reshape(-1)
+        self.ranks["-symbol"] = n - 1 - self.ranks["symbol"]
+        
+        sectors = [row.get("sector") for row in rows]
+        self.sector_masks = {
+            sector: np.array([value == sector for value in sectors]) for sector in set(sectors) if sector
+        }
+    
+    @staticmethod
+    def _dense_ranks(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Rank values ascending and descending, ties sharing a rank and missing values last."""
+        missing = np.isnan(values)
+        unique = np.unique(values[~missing])
+        ascending = np.full(len(values), len(unique))
+        ascending[~missing] = np.searchsorted(unique, values[~missing])
+        descending = np.full(len(values), len(unique))
+        descending[~missing] = len(unique) - 1 - ascending[~missing]
+        return ascending, descending
+    
+    def select(self, ranges: Dict[str, Tuple[Optional[float], Optional[float]]], sectors: Optional[List[str]]) -> np.ndarray:
+        """Return a mask of the rows within every range and in any of the sectors."""
+        mask = np.ones(len(self.rows), dtype=bool)
+        
+        for metric, (low, high) in ranges.items():
+            values = self.sorted_values[metric]
+            start = 0 if low is None else np.searchsorted(values, low, side="left")
+            end = len(values) if high is None else np.searchsorted(values, high, side="right")
+            in_range = np.zeros(len(self.rows), dtype=bool)
+            in_range[self.sorted_rows[metric][start:end]] = True
+            mask &= in_range
+        
+        if sectors:
+            in_sectors = np.zeros(len(self.rows), dtype=bool)
+            for sector in sectors:
+                if sector in self.sector_masks:
+                    in_sectors |= self.sector_masks[sector]
+            mask &= in_sectors
+        
+        return mask
+    
+    def order(self, mask: np.ndarray, sort: List[str]) -> np.ndarray:
+        """Return the selected rows ordered by the sort keys, then by symbol."""
+        selected = np.flatnonzero(mask)
+        keys = [self.ranks[key][selected] for key in list(sort) + ["symbol"]]
+        # lexsort treats its last key as the primary one
+        return selected[np.lexsort(keys[::-1])]
 
 class ScreenerService:
     @staticmethod
-    async def get_screener_data(weights: Dict[str, float] = None) -> List[Dict]:
+    def calculate_weighted_score(stock: Dict, normalized_weights: Dict[str, float]) -> float:
+        """Calculate the weighted score of a stock from its financial metrics."""
+        score = 0.0
+        metrics_used = 0
+        
+        # PE Ratio (lower is better, so we invert it)
+        if stock.get("pe_ratio") and normalized_weights.get("pe_ratio"):
+            # Only use reasonable PE ratios (0-100)
+            if 0 < stock["pe_ratio"] < 100:
+                # Normalize: lower PE ratio is better (1/PE)
+                score += (1/stock["pe_ratio"]) * normalized_weights["pe_ratio"] * 20
+                metrics_used += 1
+        
+        # ROE (higher is better)
+        if stock.get("roe") and normalized_weights.get("roe"):
+            # Normalize: 0-50% with 15% being average
+            normalized_roe = min(stock["roe"] / 30, 1)
+            score += normalized_roe * normalized_weights["roe"]
+            metrics_used += 1
+        
+        # ROA (higher is better)
+        if stock.get("roa") and normalized_weights.get("roa"):
+            # Normalize: 0-20% with 6% being average
+            normalized_roa = min(stock["roa"] / 12, 1)
+            score += normalized_roa * normalized_weights["roa"]
+            metrics_used += 1
+        
+        # Dividend Yield (higher is better)
+        if stock.get("dividend_yield") and normalized_weights.get("dividend_yield"):
+            # Normalize: 0-10% with 3.5% being average
+            normalized_div = min(stock["dividend_yield"] / 7, 1)
+            score += normalized_div * normalized_weights["dividend_yield"]
+            metrics_used += 1
+        
+        # Adjust score if not all metrics available
+        if metrics_used > 0:
+            return (score / metrics_used) * 100
+        return 0
+    
+    @staticmethod
+    async def get_screener_index(weights: Dict[str, float] = None, refresh: bool = False) -> ScreenerIndex:
         """
-        Get screener data with weighted scores for all available stocks.
+        Get the screener rows of all available stocks with weighted scores, indexed for queries.
         
         Args:
             weights: Dictionary with weights for each metric 
                     (pe_ratio, roe, roa, dividend_yield)
-        
-        Returns:
-            List of stocks with financial metrics and weighted score
+            refresh: Recalculate the scores even if they are cached
         """
         # Default weights if none provided
         if weights is None:
@@ -30,6 +166,12 @@ class ScreenerService:
             normalized_weights = {k: v/total_weight for k, v in weights.items()}
         else:
             normalized_weights = weights
+        
+        # Scores only change when the underlying fundamentals do
+        cache_key = (await fundamentals_store.version(),) + tuple(sorted(normalized_weights.items()))
+        cached = None if refresh else screener_cache.get(cache_key)
+        if cached is not None:
+            return cached
             
         # Get all available stocks
         stocks_dict = await StockService.get_available_stocks()
@@ -39,45 +181,89 @@ class ScreenerService:
         
         # Calculate weighted scores
         for stock in all_stocks_data:
-            score = 0.0
-            metrics_used = 0
-            
-            # PE Ratio (lower is better, so we invert it)
-            if stock.get("pe_ratio") and normalized_weights.get("pe_ratio"):
-                # Only use reasonable PE ratios (0-100)
-                if 0 < stock["pe_ratio"] < 100:
-                    # Normalize: lower PE ratio is better (1/PE)
-                    score += (1/stock["pe_ratio"]) * normalized_weights["pe_ratio"] * 20
-                    metrics_used += 1
-            
-            # ROE (higher is better)
-            if stock.get("roe") and normalized_weights.get("roe"):
-                # Normalize: 0-50% with 15% being average
-                normalized_roe = min(stock["roe"] / 30, 1)
-                score += normalized_roe * normalized_weights["roe"]
-                metrics_used += 1
-            
-            # ROA (higher is better)
-            if stock.get("roa") and normalized_weights.get("roa"):
-                # Normalize: 0-20% with 6% being average
-                normalized_roa = min(stock["roa"] / 12, 1)
-                score += normalized_roa * normalized_weights["roa"]
-                metrics_used += 1
-            
-            # Dividend Yield (higher is better)
-            if stock.get("dividend_yield") and normalized_weights.get("dividend_yield"):
-                # Normalize: 0-10% with 3.5% being average
-                normalized_div = min(stock["dividend_yield"] / 7, 1)
-                score += normalized_div * normalized_weights["dividend_yield"]
-                metrics_used += 1
-            
-            # Adjust score if not all metrics available
-            if metrics_used > 0:
-                stock["weighted_score"] = (score / metrics_used) * 100
-            else:
-                stock["weighted_score"] = 0
-                
-        # Sort stocks by weighted score (descending)
-        sorted_stocks = sorted(all_stocks_data, key=lambda x: x.get("weighted_score", 0), reverse=True)
-        
-        return sorted_stocks
\ No newline at end of file
+            stock["weighted_score"] = ScreenerService.calculate_weighted_score(stock, normalized_weights)
+        
+        # Version the rows by content: without a stored snapshot the cache key stays the same
+        # when upstream fundamentals change, but cursors into the old rows must not
+        content = json.dumps(all_stocks_data, sort_keys=True, default=str).encode()
+        index = ScreenerIndex(all_stocks_data, f"{zlib.crc32(content):08x}")
+        screener_cache.set(cache_key, index, MarketCalendar.data_expiry())
+        return index
+    
+    @staticmethod
+    def encode_cursor(version: str, query: str, offset: int) -> str:
+        payload = json.dumps({"v": version, "q": query, "o": offset}).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor: str, version: str, query: str) -> int:
+        """Return the offset a cursor points at, checking it belongs to the same screener data and query."""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            offset = int(payload["o"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+        
+        if payload.get("v") != version:
+            raise ValueError("Cursor has expired, start again from the first page")
+        if payload.get("q") != query or offset < 0:
+            raise ValueError("Cursor belongs to a different query")
+        return offset
+    
+    @staticmethod
+    async def screen(
+        weights: Dict[str, float] = None,
+        ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = None,
+        sectors: Optional[List[str]] = None,
+        sort: Optional[List[str]] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Filter, sort and page the screener rows.
+        
+        Args:
+            weights: Weights of the metrics in the score, as for get_screener_index
+            ranges: Inclusive (min, max) bounds per metric, either may be None
+            sectors: Keep only stocks in one of these sectors
+            sort: Sort keys, each a metric or "symbol", prefixed with "-" for descending
+            limit: Maximum number of stocks in the page
+            cursor: Cursor returned with the previous page
+        
+        Returns:
+            Dictionary with the page of stocks, the total number of matches and the
+            cursor of the next page, if any
+        """
+        ranges = {metric: bounds for metric, bounds in (ranges or {}).items() if bounds != (None, None)}
+        sort = list(sort) if sort else list(DEFAULT_SORT)
+        for metric in ranges:
+            if metric not in SCREENER_METRICS:
+                raise ValueError(f"Invalid filter: {metric}")
+        for key in sort:
+            if (key[1:] if key.startswith("-") else key) not in SORT_FIELDS:
+                raise ValueError(f"Invalid sort key: {key}")
+        
+        index = await ScreenerService.get_screener_index(weights)
+        
+        # Pages of the same query share one ordering, and cursors only work for that query
+        query_key = (
+            index.version,
+            tuple(sorted(ranges.items())),
+            tuple(sorted(sectors)) if sectors else None,
+            tuple(sort)
+        )
+        query = f"{zlib.crc32(repr(query_key).encode()):08x}"
+        offset = ScreenerService.decode_cursor(cursor, index.version, query) if cursor else 0
+        
+        order = screener_query_cache.get(query_key)
+        if order is None:
+            order = index.order(index.select(ranges, sectors), sort)
+            screener_query_cache.set(query_key, order)
+        
+        page = order[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            "stocks": [dict(index.rows[row]) for row in page],
+            "total": len(order),
+            "next_cursor": ScreenerService.encode_cursor(index.version, query, next_offset) if next_offset < len(order) else None
+        }
@@ -0,0 +1,256 @@
+import logging
+import os
+import pickle
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Expired entries are kept this long so the last good value can still be served
+STALE_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Values waiting for the writer thread beyond this are dropped rather than queued
+MAX_PENDING_WRITES = 1024
+
+class SharedCache:
+    """
+    Cache tier shared by all worker processes on a host, stored in a local SQLite file.
+    
+    Values are published atomically (a reader sees either the old or the new value),
+    expire by TTL and are evicted oldest-first once the file exceeds its size cap.
+    Leases let one worker load a key while the others wait for it to be published.
+    
+    Writes and lease releases are handed to a writer thread and applied in order,
+    so the event loop never waits for the database lock; reads never block in WAL mode.
+    """
+    
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._writer_lock = threading.Lock()
+        self._writer_pid: Optional[int] = None
+        self._writes: queue.Queue = queue.Queue()
+        self._setup()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, reconnecting after a fork."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+    
+    def _setup(self) -> None:
+        connection = self._connect()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, "
+            "stored_at REAL NOT NULL, size INTEGER NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        # Total size of all entries, kept up to date by every write
+        connection.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        connection.execute(
+            "INSERT OR IGNORE INTO stats (name, value) SELECT 'size', COALESCE(SUM(size), 0) FROM entries"
+        )
+    
+    def _submit(self, func: Callable, *args) -> None:
+        """Queue a write for the writer thread, starting it in this process if needed."""
+        if self._writer_pid != os.getpid():
+            with self._writer_lock:
+                if self._writer_pid != os.getpid():
+                    # Threads do not survive a fork, and neither should the parent's queue
+                    self._writes = queue.Queue()
+                    threading.Thread(target=self._run_writer, args=(self._writes,), name="shared-cache", daemon=True).start()
+                    self._writer_pid = os.getpid()
+        self._writes.put((func, args))
+    
+    def _run_writer(self, writes: queue.Queue) -> None:
+        while True:
+            func, args = writes.get()
+            try:
+                func(*args)
+            except Exception as e:
+                logger.warning("Shared cache write failed: %s", e)
+            finally:
+                writes.task_done()
+    
+    def flush(self) -> None:
+        """Wait until all queued writes are stored."""
+        if self._writer_pid == os.getpid():
+            self._writes.join()
+    
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return the stored value and its expiry timestamp, expired or not, or None."""
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        try:
+            return pickle.loads(row[0]), row[1]
+        except Exception:
+            logger.warning("Dropping unreadable shared cache entry %s", key)
+            self.delete(key)
+            return None
+    
+    def is_fresh(self, key: str) -> bool:
+        """Check whether an unexpired value is stored for a key, without loading it."""
+        row = self._connect().execute(
+            "SELECT 1 FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+    
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Publish a value for all workers once the writer thread has stored it."""
+        if self._writes.qsize() >= MAX_PENDING_WRITES:
+            return
+        self._submit(self._store, key, value, expires_at)
+    
+    def delete(self, key: str) -> None:
+        self._submit(self._delete, key)
+    
+    def _store(self, key: str, value: Any, expires_at: float) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        
+        with self._transaction() as connection:
+            row = connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, stored_at, size) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, expires_at, time.time(), len(blob))
+            )
+            self._add_size(connection, len(blob) - (row[0] if row else 0))
+            self._evict(connection)
+    
+    def _delete(self, key: str) -> None:
+        with self._transaction() as connection:
+            row = connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._add_size(connection, -row[0])
+    
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+    
+    @staticmethod
+    def _add_size(connection: sqlite3.Connection, delta: int) -> int:
+        connection.execute("UPDATE stats SET value = value + ? WHERE name = 'size'", (delta,))
+        return connection.execute("SELECT value FROM stats WHERE name = 'size'").fetchone()[0]
+    
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Drop long-expired entries, then the oldest ones while over the size cap."""
+        cutoff = time.time() - STALE_RETENTION_SECONDS
+        stale = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires_at < ?", (cutoff,)
+        ).fetchone()[0]
+        if stale:
+            connection.execute("DELETE FROM entries WHERE expires_at < ?", (cutoff,))
+        total = self._add_size(connection, -stale)
+        
+        freed = 0
+        while total - freed > self.max_bytes:
+            row = connection.execute(
+                "SELECT key, size FROM entries ORDER BY expires_at < ? DESC, stored_at LIMIT 1", (time.time(),)
+            ).fetchone()
+            if row is None:
+                break
+            connection.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            freed += row[1]
+        if freed:
+            self._add_size(connection, -freed)
+    
+    def acquire_lease(self, key: str, ttl: float) -> bool:
+        """
+        Try to become the only worker on this host loading a key.
+        
+        This can wait for the database lock, so call it from a thread rather than the event loop.
+        """
+        now = time.time()
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute("SELECT owner, expires_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                connection.execute("COMMIT")
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)", (key, self.owner, now + ttl)
+            )
+            connection.execute("COMMIT")
+            return True
+        except sqlite3.OperationalError:
+            # The database is busy; let the caller wait and retry
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return False
+    
+    def release_lease(self, key: str) -> None:
+        """Release a lease once the values queued before it are stored."""
+        self._submit(self._release_lease, key)
+    
+    def _release_lease(self, key: str) -> None:
+        self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+def _is_private(directory: str) -> bool:
+    """Check that only the current user can write to a directory."""
+    info = os.stat(directory)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+def default_cache_path() -> str:
+    """Return the cache file in a directory of the current user, e.g. /run/user/1000/mefic."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "mefic", "cache.sqlite3")
+    return os.path.join(tempfile.gettempdir(), f"mefic-{os.getuid()}", "cache.sqlite3")
+
+def create_shared_cache() -> Optional[SharedCache]:
+    """
+    Create the shared cache configured by SHARED_CACHE_PATH and SHARED_CACHE_MAX_MB.
+    
+    By default the cache lives in a per-user directory, so all workers of the app on a
+    host share it; an empty SHARED_CACHE_PATH turns it off. Entries are unpickled on
+    read, so the file must live in a directory that only the current user can write to.
+    """
+    path = os.getenv("SHARED_CACHE_PATH", default_cache_path())
+    if not path:
+        return None
+    
+    directory = os.path.dirname(os.path.abspath(path))
+    max_bytes = int(float(os.getenv("SHARED_CACHE_MAX_MB", "256")) * 1024 * 1024)
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if not _is_private(directory):
+            logger.warning("Shared cache disabled: %s is writable by other users", directory)
+            return None
+        return SharedCache(path, max_bytes)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Shared cache disabled: %s", e)
+        return None
+
+shared_cache = create_shared_cache()
@@ -1,22 +1,296 @@
-import yfinance as yf
-import pandas as pd
-from datetime import datetime
-from typing import Dict
+from __future__ import annotations
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from services.cache import TTLCache
+from services.market_calendar import MarketCalendar
+from services.market_data import market_data, UpstreamUnavailableError
+from services.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# Calendar days covered by each supported period
+PERIOD_DAYS = {
+    "1M": 30,
+    "3M": 90,
+    "6M": 180,
+    "1Y": 365,
+    "2Y": 730,
+    "5Y": 1825
+}
+
+# Market benchmark (Saudi index)
+BENCHMARK_SYMBOL = '^TASI'
+
+# Full price history kept per symbol, with a margin so a cached copy still covers the longest period
+HISTORY_DAYS = max(PERIOD_DAYS.values())
+HISTORY_MARGIN_DAYS = 7
+
+price_cache = TTLCache("prices")
 
 class StockService:
+    @staticmethod
+    def get_date_range(period: str) -> Tuple[datetime, datetime]:
+        """Convert a period such as "6M" into a (start_date, end_date) pair ending now."""
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Invalid period: {period}")
+        
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=PERIOD_DAYS[period])
+        return start_date, end_date
+    
+    @staticmethod
+    async def get_data_version(symbol: str, period: str) -> Tuple:
+        """
+        Identify the price data a metric over a period is computed from.
+        
+        The window is normalized to the calendar day it starts on, since the bars it
+        selects only change from one day to the next, and the last bar changes
+        whenever new data arrives. Results keyed by this version stay valid for
+        the whole trading day.
+        """
+        start_date, _ = StockService.get_date_range(period)
+        try:
+            history = await StockService.get_price_history(symbol)
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error fetching stock data: {str(e)}")
+        
+        return symbol, period, start_date.date(), history.index[-1]
+    
+    @staticmethod
+    async def get_benchmark_version() -> Optional[pd.Timestamp]:
+        """Return the date of the latest benchmark bar, or None if there is no benchmark data."""
+        try:
+            return (await StockService.get_price_history(BENCHMARK_SYMBOL)).index[-1]
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def slice_dates(data: pd.DataFrame, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Select the rows of a price history from start_date up to (excluding) end_date."""
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        
+        # Compare in the timezone of the index
+        tz = data.index.tz
+        if tz is not None:
+            start = start.tz_localize(tz) if start.tzinfo is None else start.tz_convert(tz)
+            end = end.tz_localize(tz) if end.tzinfo is None else end.tz_convert(tz)
+        else:
+            start = start.tz_localize(None)
+            end = end.tz_localize(None)
+        
+        return data[(data.index >= start) & (data.index < end)]
+    
+    @staticmethod
+    async def get_price_history(symbol: str, refresh: bool = False) -> pd.DataFrame:
+        """Return the full cached price history of a symbol, fetching it if needed."""
+        df = None if refresh else price_cache.get(symbol)
+        if df is not None:
+            return df
+        
+        async with price_cache.single_flight(symbol):
+            # Another worker may have fetched it while we waited
+            df = None if refresh else price_cache.get(symbol)
+            if df is not None:
+                return df
+            
+            start_date = datetime.now() - timedelta(days=HISTORY_DAYS + HISTORY_MARGIN_DAYS)
+            try:
+                df = await market_data.history(symbol, start_date)
+            except UpstreamUnavailableError as e:
+                # Serve the last good data rather than failing
+                stale = price_cache.get_stale(symbol)
+                if stale is None:
+                    raise
+                logger.warning("Serving stale prices for %s: %s", symbol, e)
+                return stale
+            
+            if df.empty:
+                raise ValueError(f"No data found for {symbol}")
+            
+            price_cache.set(symbol, df, MarketCalendar.data_expiry())
+        
+        return df
+    
+    @staticmethod
+    async def prefetch_histories(symbols: List[str], refresh: bool = False) -> None:
+        """Load the price histories of many symbols into the cache with one bulk download."""
+        missing = [symbol for symbol in symbols if refresh or price_cache.get(symbol) is None]
+        if not missing:
+            return
+        
+        async with price_cache.single_flight(("download",) + tuple(sorted(missing))):
+            # Another worker may have downloaded them while we waited
+            if not refresh:
+                missing = [symbol for symbol in missing if price_cache.get(symbol) is None]
+                if not missing:
+                    return
+            
+            start_date = datetime.now() - timedelta(days=HISTORY_DAYS + HISTORY_MARGIN_DAYS)
+            histories = await market_data.download(missing, start_date)
+            
+            expires_at = MarketCalendar.data_expiry()
+            for symbol, df in histories.items():
+                price_cache.set(symbol, df, expires_at)
+    
     @staticmethod
     async def get_stock_data(symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """Fetch historical stock data for a given symbol and date range."""
         try:
-            stock = yf.Ticker(symbol)
-            df = stock.history(start=start_date, end=end_date)
+            # The cached history reaches back at least this far, whenever it was fetched
+            history_start = datetime.now() - timedelta(days=HISTORY_DAYS + 1)
+            
+            if pd.Timestamp(start_date).tz_localize(None) >= pd.Timestamp(history_start):
+                # Serve from the cached full history
+                df = StockService.slice_dates(await StockService.get_price_history(symbol), start_date, end_date)
+            else:
+                # Ranges older than the cached history go upstream directly
+                df = await market_data.history(symbol, start_date, end_date)
             
             if df.empty:
                 raise ValueError(f"No data found for {symbol} in the specified date range")
                 
             return df
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error fetching stock data: {str(e)}")
+    
+    @staticmethod
+    async def get_quote(symbol: str) -> Dict:
+        """Get the latest price of a stock and its change from the previous close."""
+        try:
+            quote = await market_data.quote(symbol)
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error fetching quote: {str(e)}")
+        
+        if quote["price"] is None:
+            raise ValueError(f"No quote found for {symbol}")
+        
+        change = None
+        change_percent = None
+        if quote["previous_close"]:
+            change = quote["price"] - quote["previous_close"]
+            change_percent = change / quote["previous_close"] * 100
+        
+        return {
+            "symbol": symbol,
+            "price": quote["price"],
+            "previous_close": quote["previous_close"],
+            "change": change,
+            "change_percent": change_percent,
+            "timestamp": MarketCalendar.now()
+        }
+    
+    @staticmethod
+    async def get_benchmark_data(start_date: datetime, end_date: datetime) -> pd.Series:
+        """Fetch closing prices of the market benchmark for a given date range."""
+        market = StockService.slice_dates(await StockService.get_price_history(BENCHMARK_SYMBOL), start_date, end_date)
+        
+        if market.empty:
+            raise ValueError(f"No data found for {BENCHMARK_SYMBOL} in the specified date range")
+        
+        return market['Close']
+    
+    @staticmethod
+    async def get_returns_matrix(symbols: List[str], start_date: datetime, end_date: datetime) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Load daily returns for many symbols and the market benchmark.
+        
+        Missing histories are fetched together in one bulk download.
+        
+        Returns:
+            Tuple of a dates x symbols DataFrame of stock returns and the market returns.
+            Every series keeps its own trading dates, as for a single symbol: days a stock
+            did not trade are NaN, and the market returns cover the benchmark's dates only.
+        """
+        try:
+            await StockService.prefetch_histories(symbols + [BENCHMARK_SYMBOL])
+            
+            closes = {}
+            for symbol in symbols + [BENCHMARK_SYMBOL]:
+                try:
+                    df = StockService.slice_dates(await StockService.get_price_history(symbol), start_date, end_date)
+                except ValueError:
+                    # Stocks without data are left out, as in the comparison table
+                    continue
+                closes[symbol] = df['Close'].set_axis(pd.DatetimeIndex(df.index).tz_localize(None).normalize())
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             raise ValueError(f"Error fetching stock data: {str(e)}")
+        
+        if BENCHMARK_SYMBOL not in closes or closes[BENCHMARK_SYMBOL].empty:
+            raise ValueError(f"No data found for {BENCHMARK_SYMBOL} in the specified date range")
+        closes = pd.DataFrame(closes)
+        
+        # Returns run from each symbol's previous available close, as for a single series
+        returns = closes.ffill().pct_change().where(closes.notna())
+        
+        market_returns = returns[BENCHMARK_SYMBOL].dropna()
+        returns = returns.reindex(columns=symbols).dropna(how="all")
+        return returns, market_returns
+    
+    @staticmethod
+    def pair_with_market(returns: pd.DataFrame, market_returns: pd.Series) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Match every column of a returns matrix with the market returns on their common trading dates.
+        
+        Returns:
+            Tuple of the stock returns and one column of market returns per stock,
+            both NaN wherever either of them is missing
+        """
+        market = market_returns.reindex(returns.index).to_numpy()
+        market_aligned = pd.DataFrame(
+            np.repeat(market[:, None], returns.shape[1], axis=1),
+            index=returns.index,
+            columns=returns.columns
+        )
+        paired = returns.notna() & market_aligned.notna()
+        return returns.where(paired), market_aligned.where(paired)
+    
+    @staticmethod
+    async def calculate_batch_metrics(
+        symbols: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        compute: Callable[[pd.DataFrame, pd.Series], pd.DataFrame],
+        name: str
+    ) -> List[Dict[str, float]]:
+        """Calculate metrics for many stocks with a column-wise calculation over one returns matrix."""
+        returns, market_returns = await StockService.get_returns_matrix(symbols, start_date, end_date)
+        
+        try:
+            metrics = compute(returns, market_returns)
+        except Exception as e:
+            raise ValueError(f"Error calculating {name}: {str(e)}")
+        
+        # Skip stocks without enough data, as the comparison table does
+        metrics = metrics.replace([np.inf, -np.inf], np.nan).dropna()
+        return [{"symbol": symbol, **row} for symbol, row in metrics.to_dict("index").items()]
+    
+    @staticmethod
+    def get_daily_returns(close: pd.Series) -> pd.Series:
+        """Calculate daily returns from a series of closing prices."""
+        return close.pct_change().dropna()
+    
+    @staticmethod
+    def align_returns(returns: pd.Series, market_returns: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Match stock and market returns on their common trading dates."""
+        # Ticker history is exchange-localized while downloads are not, so compare by date
+        returns = returns.set_axis(pd.DatetimeIndex(returns.index).tz_localize(None).normalize())
+        market_returns = market_returns.set_axis(pd.DatetimeIndex(market_returns.index).tz_localize(None).normalize())
+        
+        common_dates = returns.index.intersection(market_returns.index)
+        return returns.loc[common_dates], market_returns.loc[common_dates]
     
     @staticmethod
     async def get_available_stocks() -> Dict[str, str]:
@@ -33,4 +307,4 @@ class StockService:
             '1050.SR': 'Saudi National Bank - البنك الأهلي السعودي',
             '2001.SR': 'ACWA Power - أكوا باور',
             '2330.SR': 'Advanced - المتقدمة'
-        }
\ No newline at end of file
+        }
@@ -1,57 +1,87 @@
-import pandas as pd
-import numpy as np
+from __future__ import annotations
 from typing import Dict
+from services.cache import LRUCache
+from services.stock_service import StockService
+from services.lazy import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+indicator_cache = LRUCache("indicators")
 
 class TechnicalService:
+    @staticmethod
+    def compute_technical_indicators(close: pd.Series) -> Dict[str, float]:
+        """Calculate technical indicators from a series of closing prices."""
+        # Work on a fresh frame to avoid modifying the caller's data
+        data = pd.DataFrame({'Close': close})
+        
+        # Calculate Simple Moving Averages
+        data['SMA_20'] = data['Close'].rolling(window=20).mean()
+        data['SMA_50'] = data['Close'].rolling(window=50).mean()
+        data['SMA_200'] = data['Close'].rolling(window=200).mean()
+        
+        # Calculate Exponential Moving Average
+        data['EMA_20'] = data['Close'].ewm(span=20, adjust=False).mean()
+        
+        # Calculate RSI
+        delta = data['Close'].diff()
+        gain = delta.where(delta > 0, 0)
+        loss = -delta.where(delta < 0, 0)
+        avg_gain = gain.rolling(window=14).mean()
+        avg_loss = loss.rolling(window=14).mean()
+        rs = avg_gain / avg_loss
+        data['RSI_14'] = 100 - (100 / (1 + rs))
+        
+        # Calculate MACD
+        data['EMA_12'] = data['Close'].ewm(span=12, adjust=False).mean()
+        data['EMA_26'] = data['Close'].ewm(span=26, adjust=False).mean()
+        data['MACD'] = data['EMA_12'] - data['EMA_26']
+        data['MACD_signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
+        
+        # Calculate Bollinger Bands
+        data['SMA_20'] = data['Close'].rolling(window=20).mean()
+        data['stddev'] = data['Close'].rolling(window=20).std()
+        data['bollinger_upper'] = data['SMA_20'] + (data['stddev'] * 2)
+        data['bollinger_lower'] = data['SMA_20'] - (data['stddev'] * 2)
+        
+        # Get the latest values
+        latest = data.iloc[-1]
+        
+        return {
+            "sma_20": latest['SMA_20'] if not np.isnan(latest['SMA_20']) else None,
+            "sma_50": latest['SMA_50'] if not np.isnan(latest['SMA_50']) else None,
+            "sma_200": latest['SMA_200'] if not np.isnan(latest['SMA_200']) else None,
+            "ema_20": latest['EMA_20'] if not np.isnan(latest['EMA_20']) else None,
+            "rsi_14": latest['RSI_14'] if not np.isnan(latest['RSI_14']) else None,
+            "macd": latest['MACD'] if not np.isnan(latest['MACD']) else None,
+            "macd_signal": latest['MACD_signal'] if not np.isnan(latest['MACD_signal']) else None,
+            "bollinger_upper": latest['bollinger_upper'] if not np.isnan(latest['bollinger_upper']) else None,
+            "bollinger_lower": latest['bollinger_lower'] if not np.isnan(latest['bollinger_lower']) else None
+        }
+    
     @staticmethod
     async def calculate_technical_indicators(df: pd.DataFrame) -> Dict[str, float]:
         """Calculate technical indicators for a given DataFrame of stock prices."""
         try:
-            # Make a copy to avoid modifying the original DataFrame
-            data = df.copy()
-            
-            # Calculate Simple Moving Averages
-            data['SMA_20'] = data['Close'].rolling(window=20).mean()
-            data['SMA_50'] = data['Close'].rolling(window=50).mean()
-            data['SMA_200'] = data['Close'].rolling(window=200).mean()
-            
-            # Calculate Exponential Moving Average
-            data['EMA_20'] = data['Close'].ewm(span=20, adjust=False).mean()
-            
-            # Calculate RSI
-            delta = data['Close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-            avg_gain = gain.rolling(window=14).mean()
-            avg_loss = loss.rolling(window=14).mean()
-            rs = avg_gain / avg_loss
-            data['RSI_14'] = 100 - (100 / (1 + rs))
-            
-            # Calculate MACD
-            data['EMA_12'] = data['Close'].ewm(span=12, adjust=False).mean()
-            data['EMA_26'] = data['Close'].ewm(span=26, adjust=False).mean()
-            data['MACD'] = data['EMA_12'] - data['EMA_26']
-            data['MACD_signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
-            
-            # Calculate Bollinger Bands
-            data['SMA_20'] = data['Close'].rolling(window=20).mean()
-            data['stddev'] = data['Close'].rolling(window=20).std()
-            data['bollinger_upper'] = data['SMA_20'] + (data['stddev'] * 2)
-            data['bollinger_lower'] = data['SMA_20'] - (data['stddev'] * 2)
-            
-            # Get the latest values
-            latest = data.iloc[-1]
-            
-            return {
-                "sma_20": latest['SMA_20'] if not np.isnan(latest['SMA_20']) else None,
-                "sma_50": latest['SMA_50'] if not np.isnan(latest['SMA_50']) else None,
-                "sma_200": latest['SMA_200'] if not np.isnan(latest['SMA_200']) else None,
-                "ema_20": latest['EMA_20'] if not np.isnan(latest['EMA_20']) else None,
-                "rsi_14": latest['RSI_14'] if not np.isnan(latest['RSI_14']) else None,
-                "macd": latest['MACD'] if not np.isnan(latest['MACD']) else None,
-                "macd_signal": latest['MACD_signal'] if not np.isnan(latest['MACD_signal']) else None,
-                "bollinger_upper": latest['bollinger_upper'] if not np.isnan(latest['bollinger_upper']) else None,
-                "bollinger_lower": latest['bollinger_lower'] if not np.isnan(latest['bollinger_lower']) else None
-            }
+            return TechnicalService.compute_technical_indicators(df['Close'])
         except Exception as e:
-            raise ValueError(f"Error calculating technical indicators: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error calculating technical indicators: {str(e)}")
+    
+    @staticmethod
+    async def get_technical_indicators(symbol: str, period: str, refresh: bool = False) -> Dict[str, float]:
+        """Get technical indicators for a stock over a period, served from cache when possible."""
+        version = await StockService.get_data_version(symbol, period)
+        cached = None if refresh else indicator_cache.get(version)
+        if cached is not None:
+            return dict(cached)
+        
+        # Get stock data
+        start_date, end_date = StockService.get_date_range(period)
+        df = await StockService.get_stock_data(symbol, start_date, end_date)
+        
+        # Calculate technical indicators
+        indicators = await TechnicalService.calculate_technical_indicators(df)
+        
+        indicator_cache.set(version, indicators)
+        return dict(indicators)
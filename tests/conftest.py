@@ -0,0 +1,4 @@
+import os
+
+# Keep test runs independent of the shared cache other processes on this host use
+os.environ["SHARED_CACHE_PATH"] = ""
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from benchmarks import fixtures
+
+fixtures.install()
+
+from services.portfolio_service import PortfolioService
+from services.risk_service import RiskService
+from services.stock_service import BENCHMARK_SYMBOL, StockService, price_cache
+
+SYMBOLS = ["1120.SR", "2222.SR", "7010.SR"]
+
+# Bars missing from a symbol's history, counted from the most recent one
+GAPS = {
+    "none": {},
+    "benchmark": {BENCHMARK_SYMBOL: [20, 21, 90]},
+    "stock": {"2222.SR": [30, 100]},
+}
+
+@pytest.fixture(params=list(GAPS))
+def gaps(request, monkeypatch):
+    price_history = fixtures.price_history
+    
+    def with_gaps(symbol, days=None):
+        df = price_history(symbol)
+        missing = GAPS[request.param].get(symbol, [])
+        df = df.drop(df.index[[-bar for bar in missing]])
+        return df if days is None else df.iloc[-days:]
+    
+    monkeypatch.setattr(fixtures, "price_history", with_gaps)
+    price_cache.clear()
+    yield request.param
+    price_cache.clear()
+
+@pytest.mark.parametrize("period", ["6M", "2Y"])
+def test_batch_metrics_match_single_symbol_metrics(period, gaps):
+    async def compute():
+        start_date, end_date = StockService.get_date_range(period)
+        risk = await RiskService.calculate_batch_risk_metrics(SYMBOLS, start_date, end_date)
+        portfolio = await PortfolioService.calculate_batch_portfolio_metrics(SYMBOLS, start_date, end_date)
+        
+        single = []
+        for symbol in SYMBOLS:
+            df = await StockService.get_stock_data(symbol, start_date, end_date)
+            single.append((
+                {"symbol": symbol, **await RiskService.calculate_risk_metrics(df)},
+                {"symbol": symbol, **await PortfolioService.calculate_portfolio_metrics(df)}
+            ))
+        return risk, portfolio, single
+    
+    risk, portfolio, single = asyncio.run(compute())
+    assert risk == [pytest.approx(metrics) for metrics, _ in single]
+    assert portfolio == [pytest.approx(metrics) for _, metrics in single]
@@ -0,0 +1,89 @@
+import asyncio
+import os
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from services import fundamentals_store as store_module
+from services.fundamentals_store import FundamentalsStore
+
+def metrics(pe_ratio: float, sector: str = "Energy") -> dict:
+    return {"pe_ratio": pe_ratio, "roe": None, "sector": sector}
+
+def test_write_is_atomic_and_readable_by_another_process(tmp_path):
+    store = FundamentalsStore(str(tmp_path))
+    asyncio.run(store.write(date(2026, 10, 1), {"A": metrics(10.0), "B": metrics(12.0, "Utilities")}))
+    assert sorted(os.listdir(tmp_path)) == ["2026-10-01.npz"]
+    
+    # A store that has never seen the file, as in another worker process
+    reader = FundamentalsStore(str(tmp_path))
+    stored = asyncio.run(reader.get_latest("B"))
+    assert stored["pe_ratio"] == 12.0 and stored["roe"] is None and stored["sector"] == "Utilities"
+    assert asyncio.run(reader.version())[0] == date(2026, 10, 1)
+
+def test_failed_write_keeps_the_previous_snapshot(tmp_path, monkeypatch):
+    store = FundamentalsStore(str(tmp_path))
+    asyncio.run(store.write(date(2026, 10, 1), {"A": metrics(10.0)}))
+    
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(store_module.np, "savez_compressed", fail)
+    with pytest.raises(OSError):
+        asyncio.run(store.write(date(2026, 10, 1), {"A": metrics(99.0)}))
+    
+    assert sorted(os.listdir(tmp_path)) == ["2026-10-01.npz"]
+    assert asyncio.run(FundamentalsStore(str(tmp_path)).get_latest("A"))["pe_ratio"] == 10.0
+
+def test_rewritten_snapshot_replaces_the_day(tmp_path):
+    store = FundamentalsStore(str(tmp_path))
+    asyncio.run(store.write(date(2026, 10, 1), {"A": metrics(10.0)}))
+    assert [m["pe_ratio"] for _, m in asyncio.run(store.history("A"))] == [10.0]
+    
+    asyncio.run(store.write(date(2026, 10, 1), {"A": metrics(11.0)}))
+    assert [m["pe_ratio"] for _, m in asyncio.run(store.history("A"))] == [11.0]
+    assert asyncio.run(store.get_latest("A"))["pe_ratio"] == 11.0
+
+def test_stocks_missing_from_the_latest_snapshot_fall_back_to_older_ones(tmp_path):
+    store = FundamentalsStore(str(tmp_path))
+    asyncio.run(store.write(date(2026, 10, 1), {"A": metrics(10.0), "B": metrics(20.0)}))
+    asyncio.run(store.write(date(2026, 10, 2), {"A": metrics(11.0)}))
+    
+    assert asyncio.run(store.get_latest("A"))["pe_ratio"] == 11.0
+    assert asyncio.run(store.get_latest("B"))["pe_ratio"] == 20.0
+    assert asyncio.run(store.get_latest("C")) is None
+
+def test_history_is_filtered_by_date_and_skips_missing_days(tmp_path):
+    store = FundamentalsStore(str(tmp_path))
+    for day in range(1, 6):
+        snapshot = {"A": metrics(float(day))}
+        if day != 3:
+            snapshot["B"] = metrics(float(day) * 10)
+        asyncio.run(store.write(date(2026, 10, day), snapshot))
+    
+    history = asyncio.run(store.history("B", date(2026, 10, 2), date(2026, 10, 4)))
+    assert [(day.day, m["pe_ratio"]) for day, m in history] == [(2, 20.0), (4, 40.0)]
+    assert [day.day for day, _ in asyncio.run(store.history("A", start=date(2026, 10, 4)))] == [4, 5]
+    assert [day.day for day, _ in asyncio.run(store.history("A", end=date(2026, 10, 1)))] == [1]
+    assert asyncio.run(store.history("C")) == []
+
+def test_history_does_not_reparse_snapshots(tmp_path, monkeypatch):
+    writer = FundamentalsStore(str(tmp_path))
+    first = date(2026, 1, 1)
+    for offset in range(40):
+        asyncio.run(writer.write(first + timedelta(days=offset), {"A": metrics(float(offset))}))
+    
+    loads = []
+    load = np.load
+    monkeypatch.setattr(store_module.np, "load", lambda *args, **kwargs: loads.append(args) or load(*args, **kwargs))
+    
+    # More files than parsed snapshots are kept, but each is read only once
+    store = FundamentalsStore(str(tmp_path), max_loaded=4)
+    assert len(asyncio.run(store.history("A"))) == 40
+    assert len(loads) == 40
+    asyncio.run(store.history("A"))
+    asyncio.run(store.get_latest("B"))
+    assert len(loads) == 40
+    
+    # A new day only reads the new file
+    asyncio.run(store.write(first + timedelta(days=40), {"A": metrics(40.0)}))
+    assert len(asyncio.run(store.history("A"))) == 41
+    assert len(loads) == 41
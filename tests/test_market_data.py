@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+import pytest
+from services.deadline import request_deadline
+from services.market_data import CircuitBreaker, ResilientProvider, UpstreamUnavailableError
+
+class FakeProvider:
+    name = "fake"
+    
+    def __init__(self):
+        self.fail = True
+        self.release = threading.Event()
+        self.release.set()
+    
+    def quote(self, symbol):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"price": 1.0, "previous_close": 1.0}
+
+def half_open_provider(fake: FakeProvider) -> ResilientProvider:
+    provider = ResilientProvider(fake, retries=0, failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(provider.quote("AAA"))
+    assert provider.breaker.state == "open"
+    time.sleep(0.06)
+    assert provider.breaker.state == "half-open"
+    fake.fail = False
+    return provider
+
+def test_half_open_breaker_admits_one_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+def test_rate_limited_call_does_not_take_the_probe():
+    provider = half_open_provider(FakeProvider())
+    provider.bucket.tokens = 0
+    provider.bucket.rate = 0.01
+    with pytest.raises(UpstreamUnavailableError, match="rate limit"):
+        asyncio.run(provider.quote("AAA"))
+    
+    provider.bucket.tokens = provider.bucket.capacity
+    assert asyncio.run(provider.quote("AAA"))["price"] == 1.0
+    assert provider.breaker.state == "closed"
+
+def test_cancelled_probe_is_released():
+    fake = FakeProvider()
+    provider = half_open_provider(fake)
+    fake.release.clear()
+    
+    async def cancel_probe():
+        task = asyncio.create_task(provider.quote("AAA"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    
+    asyncio.run(cancel_probe())
+    fake.release.set()
+    assert provider.breaker.state == "half-open"
+    assert asyncio.run(provider.quote("AAA"))["price"] == 1.0
+    assert provider.breaker.state == "closed"
+
+def test_probe_cut_off_by_the_deadline_is_released():
+    fake = FakeProvider()
+    provider = half_open_provider(fake)
+    fake.release.clear()
+    
+    async def call_with_deadline():
+        request_deadline.set(time.monotonic() + 0.05)
+        await provider.quote("AAA")
+    
+    with pytest.raises(UpstreamUnavailableError, match="deadline"):
+        asyncio.run(call_with_deadline())
+    fake.release.set()
+    assert provider.breaker.state == "half-open"
+    assert asyncio.run(provider.quote("AAA"))["price"] == 1.0
+    assert provider.breaker.state == "closed"
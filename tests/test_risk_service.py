@@ -0,0 +1,45 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from routes.risk import _to_list
+from services.risk_service import RiskService
+
+WINDOWS = [2, 20, 60]
+
+def returns_with_halt(seed: int, halt: slice) -> pd.Series:
+    """Random daily returns with a trading halt, i.e. flat closes and zero returns."""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.0005, 0.015, 300)
+    values[halt] = 0.0
+    return pd.Series(values, index=pd.bdate_range("2024-01-01", periods=300))
+
+def finite_or_nan(values: pd.Series) -> np.ndarray:
+    return values.replace([np.inf, -np.inf], np.nan).to_numpy()
+
+def test_rolling_metrics_match_pandas_over_a_trading_halt():
+    returns = returns_with_halt(1, slice(100, 140))
+    market_returns = returns_with_halt(2, slice(200, 240))
+    result = RiskService.compute_rolling_risk_metrics(returns, market_returns, WINDOWS)
+    
+    risk_free_rate = 0.02 / 252
+    for item in result["windows"]:
+        rolling = returns.rolling(item["window"])
+        std = rolling.std()
+        market_variance = market_returns.rolling(item["window"]).var()
+        beta = rolling.cov(market_returns) / market_variance
+        
+        assert item["volatility"] == pytest.approx((std * np.sqrt(252)).to_numpy(), rel=1e-9, abs=1e-10, nan_ok=True)
+        sharpe_ratio = (rolling.mean() - risk_free_rate) / std * np.sqrt(252)
+        assert item["sharpe_ratio"] == pytest.approx(finite_or_nan(sharpe_ratio), rel=1e-6, abs=1e-9, nan_ok=True)
+        assert item["beta"] == pytest.approx(finite_or_nan(beta.where(market_variance > 0)), rel=1e-6, abs=1e-9, nan_ok=True)
+        
+        # Ratios over windows inside the halts are undefined rather than infinite
+        if item["window"] <= 40:
+            assert np.isnan(item["sharpe_ratio"][100 + item["window"] - 1:140]).all()
+            assert np.isnan(item["beta"][200 + item["window"] - 1:240]).all()
+        assert not np.isinf(item["sharpe_ratio"]).any() and not np.isinf(item["beta"]).any()
+
+def test_non_finite_values_are_serialized_as_none():
+    assert _to_list(np.array([1.5, np.nan, np.inf, -np.inf])) == [1.5, None, None, None]
+    assert all(value is None or math.isfinite(value) for value in _to_list(np.array([0.0, 1e308 * 10])))
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from services.screener_service import ScreenerIndex, ScreenerService
+
+ROWS = [
+    {"symbol": "D", "sector": "Energy", "pe_ratio": 10.0, "roe": 5.0, "weighted_score": 0.4},
+    {"symbol": "A", "sector": "Energy", "pe_ratio": 20.0, "roe": None, "weighted_score": 0.9},
+    {"symbol": "C", "sector": "Utilities", "pe_ratio": 10.0, "roe": 15.0, "weighted_score": 0.7},
+    {"symbol": "B", "sector": None, "pe_ratio": None, "roe": 25.0, "weighted_score": 0.7},
+    {"symbol": "E", "sector": "Utilities", "pe_ratio": 30.0, "roe": 15.0, "weighted_score": 0.1},
+]
+
+@pytest.fixture
+def index(monkeypatch):
+    index = ScreenerIndex([dict(row) for row in ROWS], "v1")
+    
+    async def get_screener_index(weights=None, refresh=False):
+        return index
+    monkeypatch.setattr(ScreenerService, "get_screener_index", get_screener_index)
+    return index
+
+def symbols(index, rows):
+    return [index.rows[row]["symbol"] for row in rows]
+
+def test_select_applies_inclusive_ranges_and_sectors(index):
+    assert symbols(index, index.order(index.select({"pe_ratio": (10.0, 20.0)}, None), ["symbol"])) == ["A", "C", "D"]
+    assert symbols(index, index.order(index.select({"roe": (15.0, None)}, ["Utilities"]), ["symbol"])) == ["C", "E"]
+    assert symbols(index, index.order(index.select({}, ["Unknown"]), ["symbol"])) == []
+
+def test_order_breaks_ties_by_symbol_and_puts_missing_values_last(index):
+    everything = index.select({}, None)
+    assert symbols(index, index.order(everything, ["pe_ratio"])) == ["C", "D", "A", "E", "B"]
+    assert symbols(index, index.order(everything, ["-pe_ratio"])) == ["E", "A", "C", "D", "B"]
+    assert symbols(index, index.order(everything, ["-roe", "pe_ratio"])) == ["B", "C", "E", "D", "A"]
+    assert symbols(index, index.order(everything, ["-weighted_score"])) == ["A", "B", "C", "D", "E"]
+
+def test_cursors_page_through_one_query(index):
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(ScreenerService.screen(sort=["pe_ratio"], limit=2, cursor=cursor))
+        assert page["total"] == 5
+        seen += [stock["symbol"] for stock in page["stocks"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["C", "D", "A", "E", "B"]
+
+def test_cursor_of_another_query_is_rejected(index):
+    cursor = asyncio.run(ScreenerService.screen(limit=2))["next_cursor"]
+    with pytest.raises(ValueError, match="different query"):
+        asyncio.run(ScreenerService.screen(sort=["symbol"], limit=2, cursor=cursor))
+    with pytest.raises(ValueError, match="different query"):
+        asyncio.run(ScreenerService.screen(ranges={"roe": (10.0, None)}, limit=2, cursor=cursor))
+    
+    index.version = "v2"
+    with pytest.raises(ValueError, match="expired"):
+        asyncio.run(ScreenerService.screen(limit=2, cursor=cursor))
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        asyncio.run(ScreenerService.screen(limit=2, cursor="not-a-cursor"))
+
+@pytest.mark.parametrize("key", ["--roe", "-", "bogus", "roe-"])
+def test_invalid_sort_keys_are_rejected(index, key):
+    with pytest.raises(ValueError, match="Invalid sort key"):
+        asyncio.run(ScreenerService.screen(sort=[key]))
@@ -0,0 +1,49 @@
+import os
+import stat
+import time
+from services.shared_cache import SharedCache, create_shared_cache
+
+def test_defaults_to_a_private_per_user_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("SHARED_CACHE_PATH")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    cache = create_shared_cache()
+    
+    assert cache is not None
+    assert cache.path == str(tmp_path / "mefic" / "cache.sqlite3")
+    assert stat.S_IMODE(os.stat(tmp_path / "mefic").st_mode) == 0o700
+
+def test_refuses_a_directory_other_users_can_write_to(tmp_path, monkeypatch):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    monkeypatch.setenv("SHARED_CACHE_PATH", str(shared / "cache.sqlite3"))
+    assert create_shared_cache() is None
+    
+    monkeypatch.setenv("SHARED_CACHE_PATH", "")
+    assert create_shared_cache() is None
+
+def test_values_and_leases_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer, reader = SharedCache(path, 1024 * 1024), SharedCache(path, 1024 * 1024)
+    
+    assert writer.acquire_lease("key", 10)
+    assert not reader.acquire_lease("key", 10)
+    writer.set("key", {"value": 1}, time.time() + 60)
+    writer.release_lease("key")
+    writer.flush()
+    
+    assert reader.get("key")[0] == {"value": 1}
+    assert reader.is_fresh("key")
+    assert reader.acquire_lease("key", 10)
+
+def test_evicts_oldest_entries_beyond_the_size_cap(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.sqlite3"), 10_000)
+    for i in range(30):
+        cache.set(f"key{i}", b"x" * 1000, time.time() + 60)
+    cache.flush()
+    
+    stored = [i for i in range(30) if cache.get(f"key{i}") is not None]
+    assert stored == list(range(30 - len(stored), 30))
+    total = cache._connect().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    assert total <= 10_000
+    assert cache._connect().execute("SELECT value FROM stats WHERE name = 'size'").fetchone()[0] == total